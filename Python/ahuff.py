@@ -1,86 +1,243 @@
 import sys
+from bisect import bisect_left
+from io import BytesIO
 import struct
-from typing import BinaryIO, Optional
+from typing import BinaryIO, Optional, Sequence
+from bitio import CompressorBitio
 
-class Node:
-    def __init__(self):
-        self.weight = 0
-        self.parent = -1
-        self.child_is_leaf = False
-        self.child = 0
+BitFile = CompressorBitio.BitFile
 
 class Tree:
+    """Adaptive Huffman tree as parallel columns indexed by node number."""
+    def __init__(self):
+        self.leaf = [-1] * SYMBOL_COUNT
+        self.next_free_node = 0
+        self.weight = [0] * NODE_TABLE_COUNT
+        self.parent = [-1] * NODE_TABLE_COUNT
+        self.child = [0] * NODE_TABLE_COUNT
+        self.child_is_leaf = [False] * NODE_TABLE_COUNT
+        self.max_weight = MAX_WEIGHT
+        self.decay = DECAY
+
+class VitterTree:
+    """Algorithm V tree as columns indexed by slot.
+
+    Slots are Vitter's implicit numbering reversed: slot 0 is the root and
+    slots run by decreasing weight, with the internal nodes of a weight
+    ahead of its leaves. A slot is a position in the tree, so parent links
+    stay with the slot while a node's contents move. leader maps
+    (weight << 1) | is_leaf to the first slot of that block. unseen lists
+    the symbols not yet in the tree, in order.
+    """
     def __init__(self):
         self.leaf = [-1] * SYMBOL_COUNT
         self.next_free_node = 0
-        self.nodes = [Node() for _ in range(NODE_TABLE_COUNT)]
+        self.weight = [0] * VITTER_NODE_COUNT
+        self.parent = [-1] * VITTER_NODE_COUNT
+        self.child_0 = [0] * VITTER_NODE_COUNT
+        self.child_1 = [0] * VITTER_NODE_COUNT
+        self.symbol = [0] * VITTER_NODE_COUNT
+        self.is_leaf = [False] * VITTER_NODE_COUNT
+        self.leader = {}
+        self.unseen = []
 
 # Constants
+COMPRESSION_NAME = "Adaptive Huffman coding, with escape codes"
+USAGE = ("infile outfile [ -d ] [ -v ] [ -w n ] [ -f n ]\n\n"
+         " -v uses Vitter's Algorithm V instead of FGK\n"
+         " -w n rescales the FGK tree when its root weight reaches n\n"
+         " -f n divides the weights by n on each rescale\n")
 END_OF_STREAM = 256
 ESCAPE = 257
 SYMBOL_COUNT = 258
 NODE_TABLE_COUNT = (SYMBOL_COUNT * 2) - 1
 ROOT_NODE = 0
 MAX_WEIGHT = 0x8000
+DECAY = 2
+CHUNK_SIZE = 64 * 1024
+# Vitter streams open with the bits 01. FGK streams open with the escape
+# code, a 1 bit, or are a lone END_OF_STREAM 0 bit padded with zeros.
+VITTER_FLAG = 0b01
+# FGK streams with a non-default MAX_WEIGHT or DECAY open with 001, then
+# the two settings.
+TUNED_FLAG = 0b001
+VITTER_NODE_COUNT = (SYMBOL_COUNT * 2) - 1
 
-tree = Tree()
+class AdaptiveHuffmanCodec:
+    """One adaptive Huffman stream: its model and the bit file it codes to or from.
 
-def compress_file(input_file: BinaryIO, output_file: BinaryIO, args: list):
-    bit_output = BitFile(output_file)
-    
-    initialize_tree(tree)
-    
+    Instances share no state, so any number of streams can run in one
+    process, each on its own thread-pool worker or connection. A single
+    instance must not be driven by two threads at once. reset() clears the
+    model in place, so a codec can be pooled and reused across streams.
+    """
+    def __init__(self, vitter: bool = False, max_weight: int = MAX_WEIGHT, decay: int = DECAY):
+        self.vitter = vitter
+        self.max_weight = max_weight
+        self.decay = decay
+        self.tree = None
+        self.bit_file = None
+        self.finished = False
+
+    def reset(self, bit_file: Optional[BitFile] = None):
+        """Start over with a fresh model, reusing the tree's columns."""
+        self.bit_file = bit_file
+        self.finished = False
+        if self.vitter:
+            if not isinstance(self.tree, VitterTree):
+                self.tree = VitterTree()
+            initialize_vitter_tree(self.tree)
+            self._encode, self._decode, self._update = vitter_encode_symbol, vitter_decode_symbol, vitter_update_model
+        else:
+            if not isinstance(self.tree, Tree):
+                self.tree = Tree()
+            initialize_tree(self.tree, self.max_weight, self.decay)
+            self._encode, self._decode, self._update = encode_symbol, decode_symbol, update_model
+
+    def start_compress(self, bit_output: BitFile):
+        self.reset(bit_output)
+        if self.vitter:
+            bit_output.output_bits(VITTER_FLAG, 2)
+        elif self.max_weight != MAX_WEIGHT or self.decay != DECAY:
+            bit_output.output_bits(TUNED_FLAG, 3)
+            bit_output.output_bits(self.max_weight, 32)
+            bit_output.output_bits(self.decay, 8)
+
+    def write(self, data):
+        """Encode a chunk of bytes and fold them into the model."""
+        model = self.tree
+        bit_output = self.bit_file
+        encode = self._encode
+        update = self._update
+        for c in data:
+            encode(model, c, bit_output)
+            update(model, c)
+        bit_output.report(bytes_in=len(data))
+
+    def finish(self):
+        """End the stream with END_OF_STREAM. The caller closes the bit file."""
+        self._encode(self.tree, END_OF_STREAM, self.bit_file)
+        self.finished = True
+
+    def start_expand(self, bit_input: BitFile):
+        """Take the engine and settings from the stream's opening bits."""
+        self.vitter = False
+        self.max_weight = MAX_WEIGHT
+        self.decay = DECAY
+        if bit_input.peek_bits(2) == VITTER_FLAG:
+            bit_input.skip_bits(2)
+            self.vitter = True
+        elif bit_input.peek_bits(3) == TUNED_FLAG:
+            bit_input.skip_bits(3)
+            self.max_weight = bit_input.input_bits(32)
+            self.decay = bit_input.input_bits(8)
+        self.reset(bit_input)
+
+    def read(self, size: int = -1) -> bytes:
+        """Decode up to size bytes, or to the end of the stream; b"" once it is done."""
+        model = self.tree
+        bit_input = self.bit_file
+        decode = self._decode
+        update = self._update
+        buffer = bytearray()
+        while not self.finished and (size < 0 or len(buffer) < size):
+            c = decode(model, bit_input)
+            if c == END_OF_STREAM:
+                self.finished = True
+                break
+            buffer.append(c)
+            update(model, c)
+        bit_input.report(bytes_out=len(buffer))
+        return bytes(buffer)
+
+def compress_file(input_file: BinaryIO, bit_output: BitFile, argc: int, args: list):
+    vitter = False
+    dump = False
+    max_weight = MAX_WEIGHT
+    decay = DECAY
+    while args:
+        if args[0] == "-v":
+            vitter = True
+        elif args[0] == "-d":
+            dump = True
+        elif args[0] == "-w" and len(args) > 1:
+            max_weight = int(args[1])
+            args = args[1:]
+        elif args[0] == "-f" and len(args) > 1:
+            decay = int(args[1])
+            args = args[1:]
+        else:
+            print(f"Unused argument: {args[0]}")
+        args = args[1:]
+
+    codec = AdaptiveHuffmanCodec(vitter, max_weight, decay)
+    codec.start_compress(bit_output)
     while True:
-        byte = input_file.read(1)
-        if not byte:
+        chunk = input_file.read(CHUNK_SIZE)
+        if not chunk:
             break
-        c = byte[0]
-        encode_symbol(tree, c, bit_output)
-        update_model(tree, c)
-    
-    encode_symbol(tree, END_OF_STREAM, bit_output)
-    bit_output.flush()
+        codec.write(chunk)
+    codec.finish()
     
-    for arg in args:
-        if arg == "-d":
-            print_tree(tree)
-        else:
-            print(f"Unused argument: {arg}")
+    if dump:
+        print_tree(codec.tree)
 
-def expand_file(input_file: BinaryIO, output_file: BinaryIO, args: list):
-    bit_input = BitFile(input_file, for_reading=True)
-    
-    initialize_tree(tree)
-    
+def expand_file(bit_input: BitFile, output_file: BinaryIO, argc: int, args: list):
+    codec = AdaptiveHuffmanCodec()
+    codec.start_expand(bit_input)
     while True:
-        c = decode_symbol(tree, bit_input)
-        if c == END_OF_STREAM:
+        data = codec.read(CHUNK_SIZE)
+        if not data:
             break
-        output_file.write(bytes([c]))
-        update_model(tree, c)
+        output_file.write(data)
     
     for arg in args:
         if arg == "-d":
-            print_tree(tree)
+            print_tree(codec.tree)
         else:
             print(f"Unused argument: {arg}")
 
-def initialize_tree(tree: Tree):
-    tree.nodes[ROOT_NODE].child = ROOT_NODE + 1
-    tree.nodes[ROOT_NODE].child_is_leaf = False
-    tree.nodes[ROOT_NODE].weight = 2
-    tree.nodes[ROOT_NODE].parent = -1
+def compress_bytes(data, args: Sequence[str] = ()) -> bytearray:
+    """Compress an in-memory buffer without touching the filesystem."""
+    bit_output = BitFile.open_output_bit_buffer()
+    compress_file(BytesIO(data), bit_output, len(args), args)
+    bit_output.close_bit_file()
+    return bit_output.getvalue()
+
+def expand_bytes(data, args: Sequence[str] = ()) -> bytes:
+    bit_input = BitFile.open_input_bit_buffer(data)
+    output_file = BytesIO()
+    expand_file(bit_input, output_file, len(args), args)
+    bit_input.close_bit_file()
+    return output_file.getvalue()
 
-    tree.nodes[ROOT_NODE + 1].child = END_OF_STREAM
-    tree.nodes[ROOT_NODE + 1].child_is_leaf = True
-    tree.nodes[ROOT_NODE + 1].weight = 1
-    tree.nodes[ROOT_NODE + 1].parent = ROOT_NODE
+def initialize_tree(tree: Tree, max_weight: int = MAX_WEIGHT, decay: int = DECAY):
+    # After a rescale the root must land back below max_weight: it is at
+    # most max_weight / decay plus one per leaf.
+    if decay < 2 or max_weight <= 2 * SYMBOL_COUNT or max_weight >= 1 << 32 or decay > 255:
+        raise Exception("Fatal error in InitializeTree! Bad max weight or decay.")
+    tree.max_weight = max_weight
+    tree.decay = decay
+    # Start from clean columns: rebuild_tree scans past next_free_node and
+    # relies on unused slots having zero weight, as in the C version.
+    tree.weight[:] = [0] * NODE_TABLE_COUNT
+    tree.parent[:] = [-1] * NODE_TABLE_COUNT
+    tree.child[:] = [0] * NODE_TABLE_COUNT
+    tree.child_is_leaf[:] = [False] * NODE_TABLE_COUNT
+
+    tree.child[ROOT_NODE] = ROOT_NODE + 1
+    tree.weight[ROOT_NODE] = 2
+
+    tree.child[ROOT_NODE + 1] = END_OF_STREAM
+    tree.child_is_leaf[ROOT_NODE + 1] = True
+    tree.weight[ROOT_NODE + 1] = 1
+    tree.parent[ROOT_NODE + 1] = ROOT_NODE
     tree.leaf[END_OF_STREAM] = ROOT_NODE + 1
 
-    tree.nodes[ROOT_NODE + 2].child = ESCAPE
-    tree.nodes[ROOT_NODE + 2].child_is_leaf = True
-    tree.nodes[ROOT_NODE + 2].weight = 1
-    tree.nodes[ROOT_NODE + 2].parent = ROOT_NODE
+    tree.child[ROOT_NODE + 2] = ESCAPE
+    tree.child_is_leaf[ROOT_NODE + 2] = True
+    tree.weight[ROOT_NODE + 2] = 1
+    tree.parent[ROOT_NODE + 2] = ROOT_NODE
     tree.leaf[ESCAPE] = ROOT_NODE + 2
 
     tree.next_free_node = ROOT_NODE + 3
@@ -89,6 +246,7 @@ def initialize_tree(tree: Tree):
         tree.leaf[i] = -1
 
 def encode_symbol(tree: Tree, c: int, output: BitFile):
+    parent = tree.parent
     code = 0
     current_bit = 1
     code_size = 0
@@ -102,7 +260,7 @@ def encode_symbol(tree: Tree, c: int, output: BitFile):
             code |= current_bit
         current_bit <<= 1
         code_size += 1
-        current_node = tree.nodes[current_node].parent
+        current_node = parent[current_node]
     
     output.output_bits(code, code_size)
     
@@ -111,14 +269,15 @@ def encode_symbol(tree: Tree, c: int, output: BitFile):
         add_new_node(tree, c)
 
 def decode_symbol(tree: Tree, input_bitfile: BitFile) -> int:
+    child = tree.child
+    child_is_leaf = tree.child_is_leaf
+    input_bit = input_bitfile.input_bit
     current_node = ROOT_NODE
     
-    while not tree.nodes[current_node].child_is_leaf:
-        current_node = tree.nodes[current_node].child
-        if input_bitfile.input_bit():
-            current_node += 1
+    while not child_is_leaf[current_node]:
+        current_node = child[current_node] + input_bit()
     
-    c = tree.nodes[current_node].child
+    c = child[current_node]
     if c == ESCAPE:
         c = input_bitfile.input_bits(8)
         add_new_node(tree, c)
@@ -126,99 +285,103 @@ def decode_symbol(tree: Tree, input_bitfile: BitFile) -> int:
     return c
 
 def update_model(tree: Tree, c: int):
-    if tree.nodes[ROOT_NODE].weight == MAX_WEIGHT:
+    weight = tree.weight
+    parent = tree.parent
+    if weight[ROOT_NODE] == tree.max_weight:
         rebuild_tree(tree)
     
     current_node = tree.leaf[c]
     while current_node != -1:
-        tree.nodes[current_node].weight += 1
+        node_weight = weight[current_node] + 1
+        weight[current_node] = node_weight
         new_node = current_node
-        while new_node > ROOT_NODE:
-            if tree.nodes[new_node - 1].weight >= tree.nodes[current_node].weight:
-                break
+        while new_node > ROOT_NODE and weight[new_node - 1] < node_weight:
             new_node -= 1
         
         if current_node != new_node:
             swap_nodes(tree, current_node, new_node)
             current_node = new_node
         
-        current_node = tree.nodes[current_node].parent
+        current_node = parent[current_node]
 
 def rebuild_tree(tree: Tree):
-    print("R", end="", flush=True)
-    j = tree.next_free_node - 1
-    
-    # Collect leaves and scale weights
-    for i in range(j, ROOT_NODE - 1, -1):
-        if tree.nodes[i].child_is_leaf:
-            tree.nodes[j] = tree.nodes[i]
-            tree.nodes[j].weight = (tree.nodes[j].weight + 1) // 2
-            j -= 1
-    
-    # Rebuild internal nodes
-    i = tree.next_free_node - 2
-    while j >= ROOT_NODE:
-        k = i + 1
-        tree.nodes[j].weight = tree.nodes[i].weight + tree.nodes[k].weight
-        weight = tree.nodes[j].weight
-        tree.nodes[j].child_is_leaf = False
-        
-        k = j + 1
-        while k < len(tree.nodes) and weight < tree.nodes[k].weight:
-            k += 1
-        k -= 1
-        
-        # Shift nodes
-        for m in range(j, k):
-            tree.nodes[m] = tree.nodes[m + 1]
-        
-        tree.nodes[k].weight = weight
-        tree.nodes[k].child = i
-        tree.nodes[k].child_is_leaf = False
-        
-        i -= 2
-        j -= 1
-    
+    """Scale every leaf weight down by tree.decay and rebuild the tree.
+
+    Both queues are already sorted, so the new table is filled bottom-up in
+    one merge pass: the leaves in their current order, lightest first, and
+    the internal nodes in the order their child pairs complete. On equal
+    weights the leaf goes below, which is where the C version's
+    insert-and-shift places it.
+    """
+    weight = tree.weight
+    child = tree.child
+    child_is_leaf = tree.child_is_leaf
+    decay = tree.decay
+    count = tree.next_free_node
+
+    leaves = [i for i in range(count - 1, ROOT_NODE - 1, -1) if child_is_leaf[i]]
+    leaf_weights = [(weight[i] + decay - 1) // decay for i in leaves]
+    leaf_symbols = [child[i] for i in leaves]
+
+    new_weight = []
+    new_child = []
+    new_is_leaf = []
+    internal_weights = []
+    next_leaf = 0
+    next_internal = 0
+    for position in range(count):
+        # The pair at positions 2t and 2t + 1 from the bottom forms internal node t
+        while 2 * len(internal_weights) + 1 < position:
+            t = len(internal_weights)
+            internal_weights.append(new_weight[2 * t] + new_weight[2 * t + 1])
+        if next_leaf < len(leaves) and (next_internal == len(internal_weights) or
+                                        leaf_weights[next_leaf] <= internal_weights[next_internal]):
+            new_weight.append(leaf_weights[next_leaf])
+            new_child.append(leaf_symbols[next_leaf])
+            new_is_leaf.append(True)
+            next_leaf += 1
+        else:
+            new_weight.append(internal_weights[next_internal])
+            new_child.append(count - 2 - 2 * next_internal)
+            new_is_leaf.append(False)
+            next_internal += 1
+
+    weight[:count] = new_weight[::-1]
+    child[:count] = new_child[::-1]
+    child_is_leaf[:count] = new_is_leaf[::-1]
+
     # Rebuild parent and leaf pointers
-    for i in range(tree.next_free_node - 1, ROOT_NODE - 1, -1):
-        if tree.nodes[i].child_is_leaf:
-            k = tree.nodes[i].child
+    for i in range(count - 1, ROOT_NODE - 1, -1):
+        k = child[i]
+        if child_is_leaf[i]:
             tree.leaf[k] = i
         else:
-            k = tree.nodes[i].child
-            tree.nodes[k].parent = i
-            tree.nodes[k + 1].parent = i
+            tree.parent[k] = i
+            tree.parent[k + 1] = i
 
 def swap_nodes(tree: Tree, i: int, j: int):
+    weight = tree.weight
+    parent = tree.parent
+    child = tree.child
+    child_is_leaf = tree.child_is_leaf
+
     # Update leaf pointers
-    if tree.nodes[i].child_is_leaf:
-        tree.leaf[tree.nodes[i].child] = j
+    if child_is_leaf[i]:
+        tree.leaf[child[i]] = j
     else:
-        tree.nodes[tree.nodes[i].child].parent = j
-        tree.nodes[tree.nodes[i].child + 1].parent = j
+        parent[child[i]] = j
+        parent[child[i] + 1] = j
     
-    if tree.nodes[j].child_is_leaf:
-        tree.leaf[tree.nodes[j].child] = i
+    if child_is_leaf[j]:
+        tree.leaf[child[j]] = i
     else:
-        tree.nodes[tree.nodes[j].child].parent = i
-        tree.nodes[tree.nodes[j].child + 1].parent = i
-    
-    # Swap nodes
-    temp = Node()
-    temp.weight = tree.nodes[i].weight
-    temp.parent = tree.nodes[i].parent
-    temp.child_is_leaf = tree.nodes[i].child_is_leaf
-    temp.child = tree.nodes[i].child
+        parent[child[j]] = i
+        parent[child[j] + 1] = i
     
-    tree.nodes[i].weight = tree.nodes[j].weight
-    tree.nodes[i].parent = tree.nodes[j].parent
-    tree.nodes[i].child_is_leaf = tree.nodes[j].child_is_leaf
-    tree.nodes[i].child = tree.nodes[j].child
-    
-    tree.nodes[j].weight = temp.weight
-    tree.nodes[j].parent = temp.parent
-    tree.nodes[j].child_is_leaf = temp.child_is_leaf
-    tree.nodes[j].child = temp.child
+    # Swap nodes in place; the parent links belong to the slot, not the node
+    weight[i], weight[j] = weight[j], weight[i]
+    child[i], child[j] = child[j], child[i]
+    child_is_leaf[i], child_is_leaf[j] = child_is_leaf[j], child_is_leaf[i]
 
 def add_new_node(tree: Tree, c: int):
     lightest_node = tree.next_free_node - 1
@@ -227,25 +390,205 @@ def add_new_node(tree: Tree, c: int):
     tree.next_free_node += 2
 
     # Copy the lightest node to new position
-    tree.nodes[new_node].weight = tree.nodes[lightest_node].weight
-    tree.nodes[new_node].parent = lightest_node
-    tree.nodes[new_node].child_is_leaf = tree.nodes[lightest_node].child_is_leaf
-    tree.nodes[new_node].child = tree.nodes[lightest_node].child
+    tree.weight[new_node] = tree.weight[lightest_node]
+    tree.parent[new_node] = lightest_node
+    tree.child_is_leaf[new_node] = tree.child_is_leaf[lightest_node]
+    tree.child[new_node] = tree.child[lightest_node]
     
     # Update leaf pointer for the moved node
-    tree.leaf[tree.nodes[new_node].child] = new_node
+    tree.leaf[tree.child[new_node]] = new_node
 
     # Convert lightest node to internal node
-    tree.nodes[lightest_node].child = new_node
-    tree.nodes[lightest_node].child_is_leaf = False
+    tree.child[lightest_node] = new_node
+    tree.child_is_leaf[lightest_node] = False
 
     # Add new symbol node
-    tree.nodes[zero_weight_node].child = c
-    tree.nodes[zero_weight_node].child_is_leaf = True
-    tree.nodes[zero_weight_node].weight = 0
-    tree.nodes[zero_weight_node].parent = lightest_node
+    tree.child[zero_weight_node] = c
+    tree.child_is_leaf[zero_weight_node] = True
+    tree.weight[zero_weight_node] = 0
+    tree.parent[zero_weight_node] = lightest_node
     tree.leaf[c] = zero_weight_node
 
+def initialize_vitter_tree(tree: VitterTree):
+    # A single escape leaf, the 0-node, stands for every unseen symbol.
+    tree.weight[:] = [0] * VITTER_NODE_COUNT
+    tree.parent[:] = [-1] * VITTER_NODE_COUNT
+    tree.is_leaf[:] = [False] * VITTER_NODE_COUNT
+    tree.leaf[:] = [-1] * SYMBOL_COUNT
+    tree.is_leaf[ROOT_NODE] = True
+    tree.symbol[ROOT_NODE] = ESCAPE
+    tree.leaf[ESCAPE] = ROOT_NODE
+    tree.next_free_node = ROOT_NODE + 1
+    tree.leader = {1: ROOT_NODE}
+    tree.unseen = list(range(END_OF_STREAM + 1))
+
+def vitter_encode_symbol(tree: VitterTree, c: int, output: BitFile):
+    parent = tree.parent
+    child_1 = tree.child_1
+    code = 0
+    current_bit = 1
+    code_size = 0
+    current_node = tree.leaf[c]
+
+    if current_node == -1:
+        current_node = tree.leaf[ESCAPE]
+
+    while current_node != ROOT_NODE:
+        up = parent[current_node]
+        if child_1[up] == current_node:
+            code |= current_bit
+        current_bit <<= 1
+        code_size += 1
+        current_node = up
+
+    output.output_bits(code, code_size)
+
+    if tree.leaf[c] == -1:
+        # A new symbol goes out as its rank among the unseen symbols, in
+        # truncated binary, so escapes get shorter as the alphabet fills.
+        count = len(tree.unseen)
+        bits = count.bit_length() - 1
+        short = (2 << bits) - count
+        rank = bisect_left(tree.unseen, c)
+        if rank < short:
+            output.output_bits(rank, bits)
+        else:
+            output.output_bits(rank + short, bits + 1)
+
+def vitter_decode_symbol(tree: VitterTree, input_bitfile: BitFile) -> int:
+    child_0 = tree.child_0
+    child_1 = tree.child_1
+    is_leaf = tree.is_leaf
+    input_bit = input_bitfile.input_bit
+    current_node = ROOT_NODE
+
+    while not is_leaf[current_node]:
+        current_node = child_1[current_node] if input_bit() else child_0[current_node]
+
+    c = tree.symbol[current_node]
+    if c == ESCAPE:
+        count = len(tree.unseen)
+        bits = count.bit_length() - 1
+        short = (2 << bits) - count
+        rank = input_bitfile.input_bits(bits)
+        if rank >= short:
+            rank = ((rank << 1) | input_bitfile.input_bit()) - short
+        c = tree.unseen[rank]
+    return c
+
+def vitter_update_model(tree: VitterTree, c: int):
+    leaf_to_increment = -1
+    q = tree.leaf[c]
+    if q == -1:
+        q = vitter_add_new_node(tree, c)
+        leaf_to_increment = tree.leaf[c]
+    else:
+        # Move q to the front of its block, then hold back a leaf that is
+        # the 0-node's sibling so its parent is handled first.
+        leader = tree.leader[(tree.weight[q] << 1) | 1]
+        if leader != q:
+            vitter_swap_nodes(tree, q, leader)
+            q = leader
+        if tree.parent[q] == tree.parent[tree.leaf[ESCAPE]]:
+            leaf_to_increment = q
+            q = tree.parent[q]
+
+    slide_and_increment(tree, q)
+    if leaf_to_increment != -1:
+        slide_and_increment(tree, leaf_to_increment, False)
+
+def slide_and_increment(tree: VitterTree, p: int, climb: bool = True):
+    """Increment p, and with climb every node up to the root.
+
+    p first trades places with the leader of its block. A leaf of weight w
+    then slides past the internal nodes of weight w, and an internal node
+    of weight w past the leaves of weight w + 1, before its weight goes up.
+    The nodes of a block all carry the same weight, so both moves are a
+    single exchange of two slots, however long the block. The next node up
+    is the leaf's new parent, or the internal node's former parent.
+    """
+    weight = tree.weight
+    is_leaf = tree.is_leaf
+    parent = tree.parent
+    leader = tree.leader
+    next_free_node = tree.next_free_node
+
+    while p != -1:
+        wt = weight[p]
+        leaf = is_leaf[p]
+        key = (wt << 1) | leaf
+        first = leader[key]
+        if first != p:
+            vitter_swap_nodes(tree, p, first)
+            p = first
+
+        # Slot p + 1 starts what is left of p's block, if anything.
+        after = p + 1
+        if after < next_free_node and weight[after] == wt and is_leaf[after] == leaf:
+            leader[key] = after
+        else:
+            del leader[key]
+
+        # The block to slide past, if there is one, sits right before p.
+        former_parent = parent[p]
+        slide_key = key - 1 if leaf else key + 3
+        target = leader.get(slide_key, p)
+        if target != p:
+            vitter_swap_nodes(tree, p, target)
+            leader[slide_key] = target + 1
+
+        weight[target] = wt + 1
+        if key + 2 not in leader:
+            leader[key + 2] = target
+
+        if not climb:
+            return
+        p = parent[target] if leaf else former_parent
+
+def vitter_swap_nodes(tree: VitterTree, i: int, j: int):
+    weight = tree.weight
+    child_0 = tree.child_0
+    child_1 = tree.child_1
+    symbol = tree.symbol
+    is_leaf = tree.is_leaf
+
+    weight[i], weight[j] = weight[j], weight[i]
+    child_0[i], child_0[j] = child_0[j], child_0[i]
+    child_1[i], child_1[j] = child_1[j], child_1[i]
+    symbol[i], symbol[j] = symbol[j], symbol[i]
+    is_leaf[i], is_leaf[j] = is_leaf[j], is_leaf[i]
+
+    # The parent links belong to the slot, so repoint what now hangs off i and j
+    for node in (i, j):
+        if is_leaf[node]:
+            tree.leaf[symbol[node]] = node
+        else:
+            tree.parent[child_0[node]] = node
+            tree.parent[child_1[node]] = node
+
+def vitter_add_new_node(tree: VitterTree, c: int) -> int:
+    """Split the 0-node into an internal 0-node, a leaf for c and a new 0-node."""
+    del tree.unseen[bisect_left(tree.unseen, c)]
+    zero_node = tree.leaf[ESCAPE]
+    new_node = tree.next_free_node
+    escape_node = tree.next_free_node + 1
+    tree.next_free_node += 2
+
+    tree.is_leaf[zero_node] = False
+    tree.child_0[zero_node] = escape_node
+    tree.child_1[zero_node] = new_node
+
+    for node, symbol in ((new_node, c), (escape_node, ESCAPE)):
+        tree.weight[node] = 0
+        tree.is_leaf[node] = True
+        tree.symbol[node] = symbol
+        tree.parent[node] = zero_node
+        tree.leaf[symbol] = node
+
+    tree.leader[0] = zero_node
+    tree.leader[1] = new_node
+    return zero_node
+
 def print_tree(tree: Tree):
     print("\nHuffman Tree:")
     print_codes(tree)
@@ -259,7 +602,7 @@ def print_codes(tree: Tree):
             else:
                 print(f"<{i:3}>: ", end="")
             
-            print(f"{tree.nodes[tree.leaf[i]].weight:5} ", end="")
+            print(f"{tree.weight[tree.leaf[i]]:5} ", end="")
             print_code(tree, i)
             print()
 
@@ -270,11 +613,15 @@ def print_code(tree: Tree, c: int):
     current_node = tree.leaf[c]
 
     while current_node != ROOT_NODE:
-        if current_node & 1:
+        if isinstance(tree, VitterTree):
+            bit = tree.child_1[tree.parent[current_node]] == current_node
+        else:
+            bit = current_node & 1
+        if bit:
             code |= current_bit
         current_bit <<= 1
         code_size += 1
-        current_node = tree.nodes[current_node].parent
+        current_node = tree.parent[current_node]
 
     for i in range(code_size):
         current_bit >>= 1
@@ -0,0 +1,235 @@
+# Bradford Arrington 2025
+import sys
+import os
+import glob
+import time
+import random
+from io import BytesIO
+from bitio import CompressorBitio
+import ahuff
+import huff
+import lzss
+import lzw12
+import lzw15v
+
+DEFAULT_SIZE = 1 << 20
+REPEAT = 3
+_printed_header = False
+
+def load_corpus(file_name: str = None, size: int = DEFAULT_SIZE) -> bytes:
+    """Read the benchmark input, or build one from the book's C sources."""
+    if file_name is not None:
+        with open(file_name, 'rb') as input_file:
+            return input_file.read()
+    here = os.path.dirname(os.path.abspath(__file__))
+    data = bytearray()
+    for name in sorted(glob.glob(os.path.join(here, '..', 'C', '*.c'))):
+        with open(name, 'rb') as input_file:
+            data += input_file.read()
+    if not data:
+        data = bytearray(range(256))
+    while len(data) < size:
+        data += bytes(data)
+    return bytes(data[:size])
+
+def best_time(func, *args) -> float:
+    """Best wall time in seconds over REPEAT runs."""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def print_result(name: str, units: int, seconds: float, unit_name: str = "MB/s"):
+    global _printed_header
+    if not _printed_header:
+        print(f"{'Benchmark':<28} {'Wall Time (ms)':>15} {'Throughput':>15}")
+        _printed_header = True
+    rate = units / seconds
+    if unit_name == "MB/s":
+        rate /= 1 << 20
+    print(f"{name:<28} {seconds * 1000:15.2f} {rate:10.2f} {unit_name}")
+
+def bench_huff_decode(data: bytes):
+    """Table-driven huff decoder against the bit-at-a-time tree walk."""
+    compressed = bytes(huff.compress_bytes(data))
+
+    def decode(expand_data):
+        input_bit_file = CompressorBitio.BitFile.open_input_bit_buffer(compressed)
+        nodes = huff.Nodes()
+        huff.input_counts(input_bit_file, nodes)
+        root_node = huff.build_tree(nodes)
+        output_file = BytesIO()
+        expand_data(input_bit_file, output_file, nodes, root_node)
+        input_bit_file.close_bit_file()
+        if output_file.getvalue() != data:
+            raise Exception("Fatal error in bench! huff decode mismatch.")
+
+    print_result("huff expand (tree walk)", len(data), best_time(decode, huff.expand_data_by_tree))
+    print_result("huff expand (table)", len(data), best_time(decode, huff.expand_data))
+
+def bench_huff_encode(data: bytes):
+    """Whole-file static Huffman compression, counting pass included."""
+    print_result("huff compress", len(data), best_time(huff.compress_bytes, data))
+
+def bench_huff_parallel(data: bytes, block_size: int = 256 * 1024):
+    """Block-mode huff on one core against the process-pool compressor."""
+    def compress(parallel):
+        output_bit_file = CompressorBitio.BitFile.open_output_bit_buffer()
+        if parallel:
+            huff.compress_parallel(BytesIO(data), output_bit_file, block_size)
+        else:
+            huff.compress_blocks(BytesIO(data), output_bit_file, block_size)
+        output_bit_file.close_bit_file()
+
+    print_result("huff blocks (1 process)", len(data), best_time(compress, False))
+    print_result(f"huff blocks ({os.cpu_count()} processes)", len(data), best_time(compress, True))
+
+def bench_huff_model(data: bytes, object_size: int = 4096):
+    """Model setup (count, scale, build tree, assign codes) over small objects."""
+    objects = [data[i:i + object_size] for i in range(0, len(data), object_size)]
+
+    def build_models():
+        for block in objects:
+            counts = [0] * 256
+            for c in block:
+                counts[c] += 1
+            nodes = huff.Nodes()
+            codes = huff.Codes()
+            huff.scale_counts(counts, nodes)
+            root_node = huff.build_tree(nodes)
+            huff.convert_tree_to_code(nodes, codes, 0, 0, root_node)
+
+    print_result("huff model setup", len(objects), best_time(build_models), "obj/s")
+
+def bench_ahuff(data: bytes):
+    """Adaptive Huffman compression and expansion, in symbols per second."""
+    for name, argv in (("ahuff", []), ("ahuff -v", ["-v"])):
+        compressed = bytes(ahuff.compress_bytes(data, argv))
+
+        def expand():
+            if ahuff.expand_bytes(compressed) != data:
+                raise Exception("Fatal error in bench! ahuff decode mismatch.")
+
+        print_result(f"{name} compress", len(data), best_time(ahuff.compress_bytes, data, argv), "sym/s")
+        print_result(f"{name} expand", len(data), best_time(expand), "sym/s")
+
+def bench_ahuff_blocks(data: bytes):
+    """Vitter updates while the alphabet fills, for several alphabet sizes.
+
+    Every new symbol's leaf slides past the whole block of weight 1 leaves,
+    so the rate stays flat only if a slide does not cost the block length.
+    """
+    for count in (16, 64, 256):
+        symbols = bytes(range(count))
+        streams = (1 << 16) // count
+
+        def update():
+            tree = ahuff.VitterTree()
+            for _ in range(streams):
+                ahuff.initialize_vitter_tree(tree)
+                for c in symbols:
+                    ahuff.vitter_update_model(tree, c)
+
+        print_result(f"ahuff -v {count} new symbols", streams * count, best_time(update), "sym/s")
+
+def bench_lzss(data: bytes):
+    """LZSS compression per parse level, and with hash chains at several depths."""
+    runs = [("tree", []), ("tree lazy", ["-p", "1"]), ("tree optimal", ["-p", "2"])]
+    runs += [(f"hash chain {depth}", ["-c", str(depth)]) for depth in (4, 16, 64, 256)]
+    for name, argv in runs:
+        size = len(lzss.compress_bytes(data, argv))
+        print_result(f"lzss {name} ({size * 100 // len(data)}%)", len(data),
+                     best_time(lzss.compress_bytes, data, argv))
+
+def bench_lzss_expand(data: bytes):
+    """LZSS expansion for the book's window and the 64 KiB preset."""
+    for name, argv in (("lzss expand", []), ("lzss expand -w 2", ["-w", "2"])):
+        compressed = bytes(lzss.compress_bytes(data, argv + ["-c", "16"]))
+
+        def expand():
+            if lzss.expand_bytes(compressed) != data:
+                raise Exception("Fatal error in bench! lzss decode mismatch.")
+
+        print_result(name, len(data), best_time(expand))
+
+def bench_lzss_stream(data: bytes):
+    """LZSS through LzssCompressor in small pieces, checking what it holds between calls.
+
+    Random bytes go after the input so the hash chains see far more
+    prefixes than fit in the window.
+    """
+    data += random.Random(0).randbytes(len(data) // 4)
+    for name, argv, args in (("lzss stream", [], ()), ("lzss stream -c 4", ["-c", "4"], (12, 4, 0, 4)),
+                             ("lzss stream -w 2 -c 4", ["-w", "2", "-c", "4"], (16, 8, 0, 4))):
+        expected = bytes(lzss.compress_bytes(data, argv))
+
+        def stream():
+            compressor = lzss.LzssCompressor(*args)
+            encoder = compressor.encoder
+            head = getattr(encoder.finder, "head", {})
+            output = bytearray()
+            for start in range(0, len(data), 4096):
+                output += compressor.compress(data[start:start + 4096])
+                if len(encoder.pending) > 4096 + encoder.look_ahead_size or len(head) > encoder.window_size:
+                    raise Exception("Fatal error in bench! lzss stream state outgrew its window.")
+            output += compressor.flush()
+            if output != expected:
+                raise Exception("Fatal error in bench! lzss stream mismatch.")
+
+        print_result(name, len(data), best_time(stream))
+
+def bench_lzw(data: bytes):
+    """LZW compression with the book's hash table against dict-keyed lookup, and expansion."""
+    for module in (lzw12, lzw15v):
+        name = module.__name__
+        compressed = bytes(module.compress_bytes(data))
+        if compressed != bytes(module.compress_bytes(data, ["-k"])):
+            raise Exception(f"Fatal error in bench! {name} engines disagree.")
+
+        def expand():
+            if module.expand_bytes(compressed) != data:
+                raise Exception(f"Fatal error in bench! {name} decode mismatch.")
+
+        print_result(f"{name} compress (hash)", len(data), best_time(module.compress_bytes, data))
+        print_result(f"{name} compress (dict)", len(data), best_time(module.compress_bytes, data, ["-k"]))
+        print_result(f"{name} expand", len(data), best_time(expand))
+
+BENCHMARKS = {
+    "huff-encode": bench_huff_encode,
+    "huff-decode": bench_huff_decode,
+    "huff-model": bench_huff_model,
+    "huff-parallel": bench_huff_parallel,
+    "ahuff": bench_ahuff,
+    "ahuff-blocks": bench_ahuff_blocks,
+    "lzss": bench_lzss,
+    "lzss-expand": bench_lzss_expand,
+    "lzss-stream": bench_lzss_stream,
+    "lzw": bench_lzw,
+}
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    file_name = None
+    size = DEFAULT_SIZE
+    names = []
+    while arguments:
+        if arguments[0] == "-f" and len(arguments) > 1:
+            file_name = arguments[1]
+            arguments = arguments[2:]
+        elif arguments[0] == "-s" and len(arguments) > 1:
+            size = int(arguments[1])
+            arguments = arguments[2:]
+        elif arguments[0] in BENCHMARKS:
+            names.append(arguments[0])
+            arguments = arguments[1:]
+        else:
+            print(f"\nUsage:  bench [-f file] [-s size] [{' | '.join(BENCHMARKS)}] ...\n")
+            sys.exit(0)
+
+    data = load_corpus(file_name, size)
+    for name in names or BENCHMARKS:
+        BENCHMARKS[name](data)
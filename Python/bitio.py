@@ -1,122 +1,335 @@
 #Bradford Arrington 2025
 import sys
+import time
+from array import array
 from io import FileIO, SEEK_SET, SEEK_CUR
+from typing import Callable, Optional
 
 
 class CompressorBitio:
     PACIFIER_COUNT = 2047
+    PAGE_SIZE = 64 * 1024
+    ACCUMULATOR_BITS = 64
+    CODE_BATCH = 4096
+    _code_strings: dict = {}
+
+    @staticmethod
+    def print_pacifier(bytes_in: int, bytes_out: int):
+        """Progress callback that reproduces the book's console pacifier."""
+        sys.stdout.write(".")
+        sys.stdout.flush()
+
+    class ProgressReporter:
+        """Rate-limited progress hook for BitFile and the codecs.
+
+        Traffic is added with update(); callback(bytes_in, bytes_out) gets the
+        running totals once every_bytes more bytes have moved, or once
+        every_seconds have passed when that is set. Pass every_bytes=0 to
+        report on time alone.
+        """
+        def __init__(self, callback: Callable[[int, int], None], every_bytes: int = 1 << 20,
+                     every_seconds: float = 0.0):
+            self.callback = callback
+            self.every_bytes = every_bytes
+            self.every_seconds = every_seconds
+            self.bytes_in: int = 0
+            self.bytes_out: int = 0
+            self._next_report: int = every_bytes
+            self._last_report: float = time.monotonic()
+
+        def update(self, bytes_in: int = 0, bytes_out: int = 0):
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            if self.every_bytes and self.bytes_in + self.bytes_out >= self._next_report:
+                self.report()
+            elif self.every_seconds and time.monotonic() - self._last_report >= self.every_seconds:
+                self.report()
+
+        def report(self):
+            self._next_report = self.bytes_in + self.bytes_out + self.every_bytes
+            if self.every_seconds:
+                self._last_report = time.monotonic()
+            self.callback(self.bytes_in, self.bytes_out)
 
     class BitFile:
-        def __init__(self, name: str, input_mode: bool):
+        def __init__(self, name: Optional[str], input_mode: bool, page_size: int = 0,
+                     progress: Optional['CompressorBitio.ProgressReporter'] = None, memory=None):
             self.is_input = input_mode
-            mode = "rb" if input_mode else "wb"
-            self.file_stream: FileIO = open(name, mode)
-            self.rack: int = 0
-            self.mask: int = 0x80
-            self.pacifier_counter: int = 0
-            self._buffer: int = 0
-            self._bit_count: int = 0
+            self.progress = progress
+            # With memory set there is no file: input bits come straight out
+            # of the caller's buffer, and output pages append to a bytearray.
+            self.memory = memory
+            # Output side: bits collect MSB-first in _acc and drain a whole
+            # number of bytes into _page once ACCUMULATOR_BITS are pending.
+            # Input side: _page is a prefetch window refilled one page at a
+            # time, and _acc holds the next _acc_bits unread bits of it.
+            # input_bit, input_bits, read_bits and peek_bits all share this
+            # one cursor. _page_origin is the file offset of _page[0].
+            self._acc: int = 0
+            self._acc_bits: int = 0
+            self._page = bytearray(page_size or CompressorBitio.PAGE_SIZE)
+            self._page_fill: int = 0
+            self._page_pos: int = 0
+            self._page_origin: int = 0
+            if memory is None:
+                mode = "rb" if input_mode else "wb"
+                self.file_stream: Optional[FileIO] = open(name, mode)
+            else:
+                self.file_stream = None
+                if input_mode:
+                    self._page = memoryview(memory).cast("B")
+                    self._page_fill = len(self._page)
+
+        @staticmethod
+        def open_output_bit_file(name: str, page_size: int = 0,
+                                 progress: Optional['CompressorBitio.ProgressReporter'] = None) -> 'CompressorBitio.BitFile':
+            return CompressorBitio.BitFile(name, False, page_size, progress)
+
+        @staticmethod
+        def open_input_bit_file(name: str, page_size: int = 0,
+                                progress: Optional['CompressorBitio.ProgressReporter'] = None) -> 'CompressorBitio.BitFile':
+            return CompressorBitio.BitFile(name, True, page_size, progress)
 
         @staticmethod
-        def open_output_bit_file(name: str) -> 'CompressorBitio.BitFile':
-            return CompressorBitio.BitFile(name, False)
+        def open_input_bit_buffer(buffer, progress: Optional['CompressorBitio.ProgressReporter'] = None) -> 'CompressorBitio.BitFile':
+            """Read bits from any bytes-like object without copying it."""
+            return CompressorBitio.BitFile(None, True, 0, progress, buffer)
 
         @staticmethod
-        def open_input_bit_file(name: str) -> 'CompressorBitio.BitFile':
-            return CompressorBitio.BitFile(name, True)
+        def open_output_bit_buffer(buffer: Optional[bytearray] = None, page_size: int = 0,
+                                   progress: Optional['CompressorBitio.ProgressReporter'] = None) -> 'CompressorBitio.BitFile':
+            """Write bits into a growable bytearray, handed back by getvalue()."""
+            return CompressorBitio.BitFile(None, False, page_size, progress,
+                                           bytearray() if buffer is None else buffer)
+
+        def getvalue(self) -> bytearray:
+            return self.memory
+
+        def take_bytes(self) -> bytes:
+            """Hand back and forget every whole byte written so far to a memory buffer.
+
+            Bits short of a byte stay pending, so a stream can be drained as it grows.
+            """
+            self._drain_accumulator()
+            self._flush_page()
+            data = bytes(self.memory)
+            self.memory.clear()
+            return data
+
+        def report(self, bytes_in: int = 0, bytes_out: int = 0):
+            """Let a codec add the traffic on its uncompressed side."""
+            if self.progress is not None:
+                self.progress.update(bytes_in, bytes_out)
 
         def close_bit_file(self):
-            if not self.is_input and self.mask != 0x80:
+            if not self.is_input:
                 try:
-                    self.file_stream.write(bytes([self.rack]))
+                    if self._acc_bits & 7:
+                        self.output_bits(0, 8 - (self._acc_bits & 7))
+                    self._drain_accumulator()
+                    self._flush_page()
                 except IOError as e:
                     raise Exception(f"Fatal error in CloseBitFile! {e}")
-            self.file_stream.close()
+            if self.file_stream is not None:
+                self.file_stream.close()
+            elif self.is_input:
+                self._page.release()
+            if self.progress is not None:
+                self.progress.report()
 
         def output_bit(self, bit: int):
-            if bit != 0:
-                self.rack |= self.mask
-            self.mask >>= 1
-            if self.mask == 0:
-                try:
-                    self.file_stream.write(bytes([self.rack]))
-                    self.pacifier_counter += 1
-                    if (self.pacifier_counter & CompressorBitio.PACIFIER_COUNT) == 0:
-                        sys.stdout.write(".")
-                        sys.stdout.flush()
-                except IOError as e:
-                    raise Exception(f"Fatal error in OutputBit! {e}")
-                self.rack = 0
-                self.mask = 0x80
+            self._acc = (self._acc << 1) | (1 if bit != 0 else 0)
+            self._acc_bits += 1
+            if self._acc_bits >= CompressorBitio.ACCUMULATOR_BITS:
+                self._drain_accumulator()
 
         def output_bits(self, code: int, count: int):
-            mask_code: int = 1 << (count - 1)
-            while mask_code != 0:
-                if (mask_code & code) != 0:
-                    self.rack |= self.mask
-                self.mask >>= 1
-                if self.mask == 0:
-                    try:
-                        self.file_stream.write(bytes([self.rack]))
-                        self.pacifier_counter += 1
-                        if (self.pacifier_counter & CompressorBitio.PACIFIER_COUNT) == 0:
-                            sys.stdout.write(".")
-                            sys.stdout.flush()
-                    except IOError as e:
-                        raise Exception(f"Fatal error in OutputBit! {e}")
-                    self.rack = 0
-                    self.mask = 0x80
-                mask_code >>= 1
+            self._acc = (self._acc << count) | (code & ((1 << count) - 1))
+            self._acc_bits += count
+            if self._acc_bits >= CompressorBitio.ACCUMULATOR_BITS:
+                self._drain_accumulator()
+
+        def write_codes(self, codes, width: int):
+            """Write a batch of fixed-width codes, MSB first, as output_bits would.
+
+            codes may be any sequence of ints below 1 << width: a list, bytes,
+            array('H') or a NumPy array. Each batch is rendered as one binary
+            string and shifted into the accumulator in a single step.
+            """
+            if hasattr(codes, "tolist"):
+                codes = codes.tolist()
+            strings = CompressorBitio._code_strings.get(width)
+            if strings is None and width <= 16:
+                strings = [format(i, f"0{width}b") for i in range(1 << width)]
+                CompressorBitio._code_strings[width] = strings
+            batch = CompressorBitio.CODE_BATCH
+            for start in range(0, len(codes), batch):
+                chunk = codes[start:start + batch]
+                if strings is not None:
+                    text = "".join(map(strings.__getitem__, chunk))
+                else:
+                    text = "".join(format(code, f"0{width}b") for code in chunk)
+                self.output_bits(int(text, 2), len(text))
+
+        def read_codes(self, count: int, width: int) -> array:
+            """Read up to count fixed-width codes written by write_codes or output_bits.
+
+            Fewer codes come back only when the file runs out of whole codes.
+            """
+            codes = array("B" if width <= 8 else "H" if width <= 16 else "L" if width <= 32 else "Q")
+            mask = (1 << width) - 1
+            while count > 0:
+                n = min(count, 64)
+                need = n * width
+                if self._acc_bits < need and not self._fill(need):
+                    n = self._acc_bits // width
+                    count = n
+                    need = n * width
+                acc = self._acc
+                bits = self._acc_bits
+                codes.extend([(acc >> shift) & mask for shift in range(bits - width, bits - need - 1, -width)])
+                self._acc_bits = bits - need
+                count -= n
+            return codes
+
+        def _drain_accumulator(self):
+            """Move every complete byte in the accumulator onto the page."""
+            spare = self._acc_bits & 7
+            count = self._acc_bits >> 3
+            if count == 0:
+                return
+            data = (self._acc >> spare).to_bytes(count, "big")
+            self._acc &= (1 << spare) - 1
+            self._acc_bits = spare
+            self._put_bytes(data)
+
+        def output_bytes(self, data):
+            """Write whole bytes. At a byte boundary they bypass the accumulator."""
+            if self._acc_bits & 7:
+                if data:
+                    self.output_bits(int.from_bytes(data, "big"), len(data) << 3)
+                return
+            self._drain_accumulator()
+            self._put_bytes(data)
+
+        def _put_bytes(self, data):
+            count = len(data)
+            fill = self._page_fill
+            end = fill + count
+            if end > len(self._page):
+                self._flush_page()
+                fill = 0
+                end = count
+                if end > len(self._page):
+                    self._write_out(data)
+                    return
+            self._page[fill:end] = data
+            self._page_fill = end
+
+        def _flush_page(self):
+            if self._page_fill:
+                with memoryview(self._page) as view:
+                    self._write_out(view[:self._page_fill])
+                self._page_fill = 0
+
+        def _write_out(self, data):
+            try:
+                if self.file_stream is None:
+                    self.memory += data
+                else:
+                    self.file_stream.write(data)
+            except IOError as e:
+                raise Exception(f"Fatal error in OutputBit! {e}")
+            self._page_origin += len(data)
+            if self.progress is not None:
+                self.progress.update(0, len(data))
+
+        def _read_page(self) -> bool:
+            if self.file_stream is None:
+                return False
+            self._page_origin += self._page_fill
+            self._page_fill = self.file_stream.readinto(self._page) or 0
+            self._page_pos = 0
+            if self.progress is not None:
+                self.progress.update(self._page_fill, 0)
+            return self._page_fill != 0
+
+        def _fill(self, count: int) -> bool:
+            """Top the accumulator up to at least count bits, False at end of file."""
+            while self._acc_bits < count:
+                pos = self._page_pos
+                if pos == self._page_fill:
+                    if not self._read_page():
+                        return False
+                    pos = 0
+                take = min(self._page_fill - pos, max(8, (count - self._acc_bits + 7) >> 3))
+                self._acc = ((self._acc & ((1 << self._acc_bits) - 1)) << (take << 3)) | \
+                    int.from_bytes(self._page[pos:pos + take], "big")
+                self._acc_bits += take << 3
+                self._page_pos = pos + take
+            return True
 
         def input_bit(self) -> int:
-            if self.mask == 0x80:
-                read = self.file_stream.read(1)
-                if not read:
-                    raise Exception("Fatal error in InputBit! End of file reached.")
-                self.rack = ord(read)
-                self.pacifier_counter += 1
-                if (self.pacifier_counter & CompressorBitio.PACIFIER_COUNT) == 0:
-                    sys.stdout.write(".")
-                    sys.stdout.flush()
-            value = self.rack & self.mask
-            self.mask >>= 1
-            if self.mask == 0:
-                self.mask = 0x80
-            return 1 if value != 0 else 0
+            if self._acc_bits == 0 and not self._fill(1):
+                raise Exception("Fatal error in InputBit! End of file reached.")
+            self._acc_bits -= 1
+            return (self._acc >> self._acc_bits) & 1
 
         def read_bits(self, bits: int) -> int:
-            value: int = 0
-            while bits > 0:
-                if self._bit_count == 0:
-                    next_byte = self.file_stream.read(1)
-                    if not next_byte:
-                        raise EOFError()
-                    self._buffer = ord(next_byte)
-                    self._bit_count = 8
-
-                shift: int = min(bits, self._bit_count)
-                value = (value << shift) | ((self._buffer >> (self._bit_count - shift)) & ((1 << shift) - 1))
-                self._bit_count -= shift
-                bits -= shift
-            return value
+            if self._acc_bits < bits and not self._fill(bits):
+                raise EOFError()
+            self._acc_bits -= bits
+            return (self._acc >> self._acc_bits) & ((1 << bits) - 1)
 
         def input_bits(self, bit_count: int) -> int:
-            mask_code: int = 1 << (bit_count - 1)
-            return_value: int = 0
-            while mask_code != 0:
-                if self.mask == 0x80:
-                    read = self.file_stream.read(1)
-                    if not read:
-                        raise Exception("Fatal error in InputBit! End of file reached.")
-                    self.rack = ord(read)
-                    self.pacifier_counter += 1
-                    if (self.pacifier_counter & CompressorBitio.PACIFIER_COUNT) == 0:
-                        sys.stdout.write(".")
-                        sys.stdout.flush()
-                if (self.rack & self.mask) != 0:
-                    return_value |= mask_code
-                mask_code >>= 1
-                self.mask >>= 1
-                if self.mask == 0:
-                    self.mask = 0x80
-            return return_value
+            if self._acc_bits < bit_count and not self._fill(bit_count):
+                raise Exception("Fatal error in InputBit! End of file reached.")
+            self._acc_bits -= bit_count
+            return (self._acc >> self._acc_bits) & ((1 << bit_count) - 1)
+
+        def peek_bits(self, bit_count: int) -> int:
+            """Return the next bit_count bits without consuming them.
+
+            Past the end of the file the missing low bits read as zero, so a
+            table-driven decoder can always look up a full-width index.
+            """
+            if self._acc_bits < bit_count and not self._fill(bit_count):
+                return (self._acc & ((1 << self._acc_bits) - 1)) << (bit_count - self._acc_bits)
+            return (self._acc >> (self._acc_bits - bit_count)) & ((1 << bit_count) - 1)
+
+        def skip_bits(self, bit_count: int):
+            if self._acc_bits < bit_count and not self._fill(bit_count):
+                raise Exception("Fatal error in InputBit! End of file reached.")
+            self._acc_bits -= bit_count
+
+        def tell_bits(self) -> int:
+            """Bit offset of the read or write cursor from the start of the file."""
+            if self.is_input:
+                return ((self._page_origin + self._page_pos) << 3) - self._acc_bits
+            return ((self._page_origin + self._page_fill) << 3) + self._acc_bits
+
+        def align_bits(self):
+            """Pad the output with zero bits, or skip input bits, to a byte boundary."""
+            if self.is_input:
+                self._acc_bits -= self._acc_bits & 7
+            elif self._acc_bits & 7:
+                self.output_bits(0, -self._acc_bits & 7)
+
+        def seek_bits(self, position: int):
+            """Move the read cursor to a bit offset returned by tell_bits."""
+            if not self.is_input:
+                raise Exception("Fatal error in SeekBits! Output bit files cannot seek.")
+            byte_offset = position >> 3
+            if self._page_origin <= byte_offset <= self._page_origin + self._page_fill:
+                self._page_pos = byte_offset - self._page_origin
+            elif self.file_stream is None:
+                raise Exception("Fatal error in SeekBits! Position is past the end of the buffer.")
+            else:
+                self.file_stream.seek(byte_offset, SEEK_SET)
+                self._page_origin = byte_offset
+                self._page_fill = 0
+                self._page_pos = 0
+            self._acc = 0
+            self._acc_bits = 0
+            if position & 7:
+                self.skip_bits(position & 7)
@@ -9,6 +9,7 @@ import io
 from typing import List, Optional, Tuple
 from weakref import ref
 import zlib
+from bitio import CompressorBitio
 
 class CarProcessor:
     UNUSED = 0
@@ -57,10 +58,15 @@ class CarProcessor:
         self.DataBuffer = bytearray(17)
         self.FlagBitMask = 0
         self.BufferOffset = 0
+        self.Progress: Optional[CompressorBitio.ProgressReporter] = None
 
     def ModWindow(self, a: int) -> int:
         return a & (self.WINDOW_SIZE - 1)
 
+    def ReportProgress(self, bytes_in: int, bytes_out: int):
+        if self.Progress is not None:
+            self.Progress.update(bytes_in, bytes_out)
+
     def UsageExit(self):
         print("CARMAN -- Compressed Archive MANager")
         print("Usage: carman command car-file [file ...]")
@@ -392,7 +398,6 @@ class CarProcessor:
 
     def Store(self, inputTextFile) -> bool:
         buffer = bytearray(256)
-        pacifier = 0
         self.Header.OriginalCrc = self.CrcMask
         
         while True:
@@ -403,9 +408,7 @@ class CarProcessor:
             if self.OutputCarFile:
                 self.OutputCarFile.write(buffer[:n])
             
-            pacifier += 1
-            if (pacifier & 15) == 0:
-                print('.', end='')
+            self.ReportProgress(n, n)
         
         self.Header.CompressedSize = self.Header.OriginalSize
         self.Header.OriginalCrc ^= self.CrcMask
@@ -413,7 +416,6 @@ class CarProcessor:
 
     def Unstore(self, destination) -> int:
         crc = self.CrcMask
-        pacifier = 0
         
         while self.Header.OriginalSize != 0:
             count = min(256, self.Header.OriginalSize)
@@ -422,9 +424,7 @@ class CarProcessor:
                 self.FatalError("Can't read from input CAR file")
             
             destination.write(data)
-            pacifier += 1
-            if (pacifier & 15) == 0:
-                print('.', end='')
+            self.ReportProgress(count, count)
             
             self.Header.OriginalSize -= count
         
@@ -578,6 +578,7 @@ class CarProcessor:
             
         if self.OutputCarFile:
             self.OutputCarFile.write(self.DataBuffer[:self.BufferOffset])
+        self.ReportProgress(0, self.BufferOffset)
         self.InitOutputBuffer()
         return 1
 
@@ -675,7 +676,7 @@ class CarProcessor:
                 # Add new string
                 current_position = self.ModWindow(current_position + 1)
                 if current_position == 0:
-                    print('.', end='', file=sys.stderr)
+                    self.ReportProgress(self.WINDOW_SIZE, 0)
                 
                 if look_ahead_bytes > 0:
                     match_length = self.AddString(current_position, match_position)
@@ -701,8 +702,8 @@ class CarProcessor:
                 crc = self.UpdateCharacterCRC32(crc, byte[0])
                 self.Window[current_position] = byte[0]
                 current_position = self.ModWindow(current_position + 1)
-                if current_position == 0 and output != sys.stdout:
-                    print('.', end='', file=sys.stderr)
+                if current_position == 0:
+                    self.ReportProgress(0, self.WINDOW_SIZE)
             else:
                 # Read position/length pair
                 byte1 = self.input_car_file.read(1)
@@ -722,8 +723,8 @@ class CarProcessor:
                     crc = self.UpdateCharacterCRC32(crc, char)
                     self.Window[current_position] = char
                     current_position = self.ModWindow(current_position + 1)
-                    if current_position == 0 and output != sys.stdout:
-                        print('.', end='', file=sys.stderr)
+                    if current_position == 0:
+                        self.ReportProgress(0, self.WINDOW_SIZE)
         
         return crc ^ self.CRC_MASK
 
@@ -742,6 +743,7 @@ def main():
     
     cp = CarProcessor()
     cp.BuildCRCTable()
+    cp.Progress = CompressorBitio.ProgressReporter(CompressorBitio.print_pacifier, cp.WINDOW_SIZE)
     
     command = cp.ParseArguments(len(sys.argv), sys.argv)
     print("\n")
@@ -1,6 +1,9 @@
 import math
 import struct
 import sys
+from io import BytesIO, FileIO
+from typing import Sequence
+from bitio import CompressorBitio
 
 COMPRESSION_NAME = "Sound sample companding"
 USAGE = "infile outfile [n]\n\n n optionally sets the bits per sample\n\n"
@@ -13,53 +16,72 @@ def get_file_length(file):
     file.seek(current_pos, 0)  # SEEK_SET
     return length - current_pos
 
-def compress_file(self, input_stream: FileIO, output: 'Compressor.BitFile', argc: int, argv: list[str]):
+def compress_file(input_file: FileIO, output: 'CompressorBitio.BitFile', argc: int, argv: list[str]):
     compress = [0] * 256
-           
+
+    bits = int(argv[0]) if argc > 0 else 4
     print(f"Compressing using {bits} bits per sample...")
     steps = 1 << (bits - 1)
-    
-    bit_output = BitFile(output_file, 'w')
-    bit_output.output_bits(bits, 8)
-    bit_output.output_bits(get_file_length(input_file), 32)
-    
+
+    output.output_bits(bits, 8)
+    output.output_bits(get_file_length(input_file), 32)
+
     for i in range(steps, 0, -1):
         value = int(128.0 * (math.pow(2.0, i / steps) - 1.0) + 0.5)
         for j in range(value, 0, -1):
             compress[j + 127] = i + steps - 1
             compress[128 - j] = steps - i
-    
+
+    # Every sample maps to a code below 256, so a whole block of samples
+    # translates to codes in one call and goes out as one batch.
+    table = bytes(compress)
     while True:
-        byte_data = input_file.read(1)
-        if not byte_data:
+        samples = input_file.read(CompressorBitio.CODE_BATCH)
+        if not samples:
             break
-        c = byte_data[0]
-        bit_output.output_bits(compress[c], bits)
-    
-    bit_output.flush()
+        output.write_codes(samples.translate(table), bits)
+        output.report(bytes_in=len(samples))
 
-def expand_file(self, input_stream: 'Compressor.BitFile', output_stream: FileIO, argc: int, argv: list[str]):
+def expand_file(input_file: 'CompressorBitio.BitFile', output_file: FileIO, argc: int, argv: list[str]):
     expand = [0] * 256
 
-    bit_input = BitFile(input_file, 'r')
-    bits = bit_input.input_bits(8)
+    bits = input_file.input_bits(8)
     print(f"Expanding using {bits} bits per sample...")
-    
+
     steps = 1 << (bits - 1)
     last_value = 0
-    
+
     for i in range(1, steps + 1):
         value = int(128.0 * (math.pow(2.0, i / steps) - 1.0) + 0.5)
         expand[steps + i - 1] = 128 + (value + last_value) // 2
         expand[steps - i] = 127 - (value + last_value) // 2
         last_value = value
-    
-    count = bit_input.input_bits(32)
-    for _ in range(count):
-        c = bit_input.input_bits(bits)
-        output_file.write(bytes([expand[c]]))
-    
+
+    table = bytes(expand)
+    count = input_file.input_bits(32)
+    while count > 0:
+        codes = input_file.read_codes(min(count, CompressorBitio.CODE_BATCH), bits)
+        if not codes:
+            raise Exception("Fatal error in ExpandFile! End of file reached.")
+        output_file.write(bytes(codes).translate(table))
+        input_file.report(bytes_out=len(codes))
+        count -= len(codes)
+
     while argc > 0:
         print(f"Unused argument: {argv[0]}")
         argc -= 1
-        argv = argv[1:]
\ No newline at end of file
+        argv = argv[1:]
+
+def compress_bytes(data, argv: Sequence[str] = ()) -> bytearray:
+    """Compress an in-memory buffer without touching the filesystem."""
+    output = CompressorBitio.BitFile.open_output_bit_buffer()
+    compress_file(BytesIO(data), output, len(argv), argv)
+    output.close_bit_file()
+    return output.getvalue()
+
+def expand_bytes(data, argv: Sequence[str] = ()) -> bytes:
+    input_file = CompressorBitio.BitFile.open_input_bit_buffer(data)
+    output_file = BytesIO()
+    expand_file(input_file, output_file, len(argv), argv)
+    input_file.close_bit_file()
+    return output_file.getvalue()
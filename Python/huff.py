@@ -1,58 +1,238 @@
 #Brad Arrington
+import os
+import struct
 import sys
-from collections import namedtuple
+from array import array
+from heapq import heapify, heappop, heappush
+from io import BytesIO, FileIO, SEEK_END
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Sequence
+from bitio import CompressorBitio
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 END_OF_STREAM = 256
+NODE_COUNT = 513
+CHUNK_SIZE = 64 * 1024
+# A classic stream opens with the first and last symbol of a count run, and
+# last is never below first, so 0xFF 0x00 cannot start one.
+BLOCK_MARKER = 0xFF00
+INDEX_MAGIC = b"HIDX"
+LOOKUP_BITS = 10
 COMPRESSION_NAME = "static order 0 model with Huffman coding"
-USAGE = "infile outfile [-d]\n\nSpecifying -d will dump the modeling data\n"
+USAGE = ("infile outfile [-d] [-l n] [-b n] [-p n]\n\nSpecifying -d will dump the modeling data\n"
+         "Specifying -l n limits Huffman codes to n bits\n"
+         "Specifying -b n compresses in n MiB blocks, each with its own model\n"
+         "Specifying -p n compresses blocks on n worker processes\n")
     
 def FilePrintBinary(file, code, bits):
     """Placeholder for printing the binary code."""
     print(f"<{code:0{bits}b}>", end="")
     pass
 
-class Node:
-    def __init__(self):
-        self.count = 0
-        self.saved_count = 0
-        self.child_0 = 0
-        self.child_1 = 0
+class Nodes:
+    """The Huffman tree as parallel arrays indexed by node number.
 
-class Code:
-    def __init__(self):
-        self.code = 0
-        self.code_bits = 0
+    Slots 0-256 are the leaves, internal nodes are allocated from 257 up.
+    """
+    def __init__(self, size: int = NODE_COUNT):
+        self.count = array("H", bytes(2 * size))
+        self.saved_count = array("H", bytes(2 * size))
+        self.child_0 = array("H", bytes(2 * size))
+        self.child_1 = array("H", bytes(2 * size))
+
+class Codes:
+    """Huffman code and code length for each symbol, as flat arrays."""
+    def __init__(self, size: int = END_OF_STREAM + 1):
+        self.code = array("L", [0]) * size
+        self.code_bits = array("B", bytes(size))
 
 def LINE():
     return sys._getframe(1).f_lineno
 
 def compress_file(input_file: FileIO, output_bit_file: 'CompressorBitio.BitFile',  argc: int, argv: list[str]):
+    dump = False
+    max_bits = 0
+    block_size = 0
+    workers = 0
+    while argc > 0:
+        if argv[0] == "-d":
+            dump = True
+        elif argv[0] == "-l" and argc > 1:
+            max_bits = int(argv[1])
+            argc -= 1
+            argv = argv[1:]
+        elif argv[0] == "-p" and argc > 1:
+            workers = int(argv[1])
+            argc -= 1
+            argv = argv[1:]
+        elif argv[0] == "-b" and argc > 1:
+            block_size = int(argv[1]) << 20
+            argc -= 1
+            argv = argv[1:]
+        else:
+            print(f"Unused argument: {argv[0]}")
+        argc -= 1
+        argv = argv[1:]
+
+    if workers:
+        compress_parallel(input_file, output_bit_file, block_size or 1 << 20, workers, max_bits)
+    elif block_size:
+        compress_blocks(input_file, output_bit_file, block_size, max_bits, dump)
+    else:
+        compress_block(input_file, output_bit_file, max_bits, dump)
+
+def compress_block(input_file, output_bit_file, max_bits=0, dump=False):
+    """Model input_file, write its counts and encode it, ending with END_OF_STREAM."""
     counts = [0] * 256
-    nodes = [Node() for _ in range(514)]
-    codes = [Code() for _ in range(257)]
+    nodes = Nodes()
+    codes = Codes()
 
     count_bytes(input_file, counts)
     scale_counts(counts, nodes)
+    if max_bits:
+        limit_code_lengths(nodes, max_bits)
     output_counts(output_bit_file, nodes)
     root_node = build_tree(nodes)
     convert_tree_to_code(nodes, codes, 0, 0, root_node)
     
-    if len(argv) > 0 and argv[0] == "-d":
+    if dump:
         print_model(nodes, codes)
 
     compress_data(input_file, output_bit_file, codes)
 
+def compress_blocks(input_file, output_bit_file, block_size, max_bits=0, dump=False):
+    """Single-pass block mode: buffer block_size bytes at a time, each with its own model.
+
+    After BLOCK_MARKER, every block is a 0x01 byte followed by a classic
+    stream padded to a byte boundary. A 0x00 byte ends the file.
+    """
+    output_bit_file.output_bits(BLOCK_MARKER, 16)
+    while True:
+        block = read_block(input_file, block_size)
+        if not block:
+            break
+        output_bit_file.output_bits(1, 8)
+        compress_block(BytesIO(block), output_bit_file, max_bits, dump)
+        output_bit_file.align_bits()
+    output_bit_file.output_bits(0, 8)
+
+def compress_parallel(input_file, output_bit_file, block_size, workers=None, max_bits=0):
+    """Block mode with the blocks modeled and encoded on worker processes.
+
+    The stream is the compress_blocks layout, so expand_file reads it as
+    usual, followed by an index: the 64-bit offset of each block's classic
+    stream, a 32-bit block count and INDEX_MAGIC.
+    """
+    workers = workers or os.cpu_count() or 1
+    argv = ["-l", str(max_bits)] if max_bits else []
+    offsets = []
+    pending = deque()
+    output_bit_file.output_bits(BLOCK_MARKER, 16)
+    with ProcessPoolExecutor(workers) as executor:
+        while True:
+            block = read_block(input_file, block_size)
+            if block:
+                pending.append(executor.submit(compress_bytes, bytes(block), argv))
+                output_bit_file.report(bytes_in=len(block))
+            # Keep a couple of blocks per worker in flight and write the
+            # finished ones in input order.
+            while pending and (not block or len(pending) >= 2 * workers):
+                output_bit_file.output_bits(1, 8)
+                offsets.append(output_bit_file.tell_bits() >> 3)
+                output_bit_file.output_bytes(pending.popleft().result())
+            if not block:
+                break
+    output_bit_file.output_bits(0, 8)
+    output_bit_file.output_bytes(struct.pack(f">{len(offsets)}QI", *offsets, len(offsets)))
+    output_bit_file.output_bytes(INDEX_MAGIC)
+
+def read_block_index(input_file):
+    """Return (block offsets, index offset) from a compress_parallel file, or None."""
+    input_file.seek(0, SEEK_END)
+    end = input_file.tell()
+    if end < 11:
+        return None
+    input_file.seek(end - 8)
+    tail = input_file.read(8)
+    if tail[4:] != INDEX_MAGIC:
+        return None
+    count = struct.unpack(">I", tail[:4])[0]
+    index_start = end - 8 - 8 * count
+    if index_start < 3:
+        return None
+    input_file.seek(index_start)
+    return list(struct.unpack(f">{count}Q", input_file.read(8 * count))), index_start
+
+def expand_parallel(input_file, output_file, workers=None):
+    """Expand a compress_parallel file, seeking straight to each block through its index."""
+    index = read_block_index(input_file)
+    if index is None:
+        raise Exception("Fatal error in ExpandParallel! No block index found.")
+    offsets, index_start = index
+    workers = workers or os.cpu_count() or 1
+    pending = deque()
+    with ProcessPoolExecutor(workers) as executor:
+        # Every block is followed by a one-byte marker: 0x01 before the
+        # next block, 0x00 before the index
+        for start, end in zip(offsets, offsets[1:] + [index_start]):
+            input_file.seek(start)
+            pending.append(executor.submit(expand_bytes, input_file.read(end - 1 - start)))
+            while len(pending) >= 2 * workers:
+                output_file.write(pending.popleft().result())
+        while pending:
+            output_file.write(pending.popleft().result())
+
+def read_block(input_file, block_size):
+    """Read up to block_size bytes, retrying short reads from pipes and sockets."""
+    block = bytearray()
+    while len(block) < block_size:
+        chunk = input_file.read(block_size - len(block))
+        if not chunk:
+            break
+        block += chunk
+    return block
+
 def expand_file(input_bit_file: 'CompressorBitio.BitFile', output_file: FileIO, argc: int, argv: list[str]):
-    nodes = [Node() for _ in range(514)]
+    dump = len(argv) > 0 and argv[0] == "-d"
+
+    if input_bit_file.peek_bits(16) != BLOCK_MARKER:
+        expand_block(input_bit_file, output_file, dump)
+        return
+
+    input_bit_file.skip_bits(16)
+    while input_bit_file.input_bits(8) != 0:
+        expand_block(input_bit_file, output_file, dump)
+        input_bit_file.align_bits()
+
+def expand_block(input_bit_file, output_file, dump=False):
+    nodes = Nodes()
 
     input_counts(input_bit_file, nodes)
     root_node = build_tree(nodes)
 
-    if len(argv) > 0 and argv[0] == "-d":
+    if dump:
         print_model(nodes, None) # Pass None instead of 0 for codes
 
     expand_data(input_bit_file, output_file, nodes, root_node)
 
+def compress_bytes(data, argv: Sequence[str] = ()) -> bytearray:
+    """Compress an in-memory buffer without touching the filesystem."""
+    output_bit_file = CompressorBitio.BitFile.open_output_bit_buffer()
+    compress_file(BytesIO(data), output_bit_file, len(argv), argv)
+    output_bit_file.close_bit_file()
+    return output_bit_file.getvalue()
+
+def expand_bytes(data, argv: Sequence[str] = ()) -> bytes:
+    input_bit_file = CompressorBitio.BitFile.open_input_bit_buffer(data)
+    output_file = BytesIO()
+    expand_file(input_bit_file, output_file, len(argv), argv)
+    input_bit_file.close_bit_file()
+    return output_file.getvalue()
+
 def output_counts(output_bit_file, nodes):
     last = 256
     next_ = 1
@@ -60,7 +240,7 @@ def output_counts(output_bit_file, nodes):
     first = 0
     # Find the first non-zero count node
 
-    while first < 255 and nodes[first].count == 0:
+    while first < 255 and nodes.count[first] == 0:
         first += 1
 
     while first < 256:
@@ -69,7 +249,7 @@ def output_counts(output_bit_file, nodes):
         while True:
             # Find first zero-count node
             while last < 256:
-                if nodes[last].count == 0:
+                if nodes.count[last] == 0:
                     break
                 last += 1
 
@@ -78,7 +258,7 @@ def output_counts(output_bit_file, nodes):
             # Find next nonzero-count node
             next_ = last + 1
             while next_ < 256:
-                if nodes[next_].count != 0:
+                if nodes.count[next_] != 0:
                      break
                 next_ += 1
 
@@ -91,19 +271,19 @@ def output_counts(output_bit_file, nodes):
             last = next_
 
         try:
-            output_bit_file.file_stream.write(bytes([first]))
+            output_bit_file.output_bits(first, 8)
         except Exception:
             print("Error writing byte counts (range)", LINE())
             
         try:
-            output_bit_file.file_stream.write(bytes([last]))
+            output_bit_file.output_bits(last, 8)
         except Exception:
             print("Error writing byte counts (range)", LINE())
             
         for i in range(first, last + 1):
             try:
                 # Assuming scaled count fits in one byte (max count is <= 255 after scaling).
-                output_bit_file.file_stream.write(bytes([nodes[i].count])) # != nodes[i].count:
+                output_bit_file.output_bits(nodes.count[i], 8)
             except Exception:
                 print("Error writing byte counts (data)",  LINE())
         
@@ -111,37 +291,33 @@ def output_counts(output_bit_file, nodes):
     
     # Write the termination marker (first == 0)
     try:
-        output_bit_file.file_stream.write(bytes(1))
+        output_bit_file.output_bits(0, 8)
     except Exception:
         print("Error writing byte counts (terminator)",  LINE())
 
 
 def input_counts(input_bit_file, nodes):
     for i in range(256):
-        nodes[i].count = 0
+        nodes.count[i] = 0
 
-    value = input_bit_file.file_stream.read(1)
-    first = value[0]
+    first = input_bit_file.input_bits(8)
     if first == -1: 
         print("Error reading byte counts (first)",  LINE())
 
-    value = input_bit_file.file_stream.read(1)
-    last = value[0]
+    last = input_bit_file.input_bits(8)
     if last == -1: 
         print("Error reading byte counts (last)",  LINE())
 
     while True:
         for i in range(first, last + 1):
-            value = input_bit_file.file_stream.read(1)
-            c = value[0]
+            c = input_bit_file.input_bits(8)
             if c == -1: 
                 print("Error reading byte counts (data)",  LINE())
             else:
-                nodes[i].count = c # c is the count (0-255)
+                nodes.count[i] = c # c is the count (0-255)
 
         # Read the next 'first' marker
-        value = input_bit_file.file_stream.read(1)
-        first = value[0]
+        first = input_bit_file.input_bits(8)
         if first == -1: 
             print("Error reading byte counts (next first)",  LINE())
 
@@ -149,13 +325,12 @@ def input_counts(input_bit_file, nodes):
             break # Termination marker found
 
         # Read the next 'last' marker
-        value = input_bit_file.file_stream.read(1)
-        last = value[0]
+        last = input_bit_file.input_bits(8)
         if last == -1: 
             print("Error reading byte counts (next last)",  LINE())
 
     # Set EOF count
-    nodes[END_OF_STREAM].count = 1
+    nodes.count[END_OF_STREAM] = 1
 
 
 def count_bytes(input_file, counts):
@@ -163,16 +338,16 @@ def count_bytes(input_file, counts):
 
     input_file.seek(0) # Ensure we read from the start for counting
     while True:
-        c = input_file.read(1)
-        if not c:
+        chunk = input_file.read(CHUNK_SIZE)
+        if not chunk:
             break # EOF
-        c_val = c[0]
-        counts[c_val] += 1
-    
-    print(f"len {len(counts)}")
-    #for i in range(30):
-    #  print(f" counts {counts[i]}")
-      
+        if np is not None:
+            for c, n in enumerate(np.bincount(np.frombuffer(chunk, np.uint8), minlength=256).tolist()):
+                counts[c] += n
+        else:
+            for c, n in Counter(chunk).items():
+                counts[c] += n
+
     input_file.seek(input_marker)
 
 
@@ -196,64 +371,75 @@ def scale_counts(counts, nodes):
         # Ensure any non-zero count is at least 1 after scaling
         if scaled_count == 0 and counts[i] != 0:
             scaled_count = 1
-        nodes[i].count = scaled_count
+        nodes.count[i] = scaled_count
 
     # Set EOF count
-    nodes[END_OF_STREAM].count = 1
+    nodes.count[END_OF_STREAM] = 1
 
 
 def build_tree(nodes):
-    nodes[513].count = 0xFFFF # High value (65535)
+    # Merge the two smallest (count, node) pairs until one node is left.
+    # Ordering on the node number as well as the count picks the same pair
+    # as the original linear scan, so the tree and the codes are unchanged.
+    count = nodes.count
+    heap = [(count[i], i) for i in range(END_OF_STREAM + 1) if count[i] != 0]
+    heapify(heap)
     next_free = END_OF_STREAM + 1 # Start non-leaf nodes after 257 (0-256 for chars + EOF)
 
-    while True:
-        min_1 = 513
-        min_2 = 513
-
-        # Find two nodes with the minimum non-zero counts
-        for i in range(next_free):
-            if nodes[i].count != 0:
-                if nodes[i].count < nodes[min_1].count:
-                    min_2 = min_1
-                    min_1 = i
-                elif nodes[i].count < nodes[min_2].count:
-                    min_2 = i
-
-        if min_2 == 513:
-            break # Tree is complete (only one node left, min_1)
-
-        nodes[next_free].count = nodes[min_1].count + nodes[min_2].count
-        
-        # Save counts and zero them out to prevent re-selection
-        nodes[min_1].saved_count = nodes[min_1].count
-        nodes[min_1].count = 0
-        nodes[min_2].saved_count = nodes[min_2].count
-        nodes[min_2].count = 0
-
-        # Set children
-        nodes[next_free].child_0 = min_1
-        #print(f"child0_bt {min_1}")
-        nodes[next_free].child_1 = min_2
-        #print(f"child1_bt {min_2}")
-        
+    while len(heap) > 1:
+        count_1, min_1 = heappop(heap)
+        count_2, min_2 = heappop(heap)
+        count[next_free] = count_1 + count_2
+
+        # Save counts and zero them out, the way the C version marks merged nodes
+        nodes.saved_count[min_1] = count_1
+        count[min_1] = 0
+        nodes.saved_count[min_2] = count_2
+        count[min_2] = 0
+
+        nodes.child_0[next_free] = min_1
+        nodes.child_1[next_free] = min_2
+        heappush(heap, (count[next_free], next_free))
         next_free += 1
 
     # next_free points one past the root node, so decrement to get the root's index
     next_free -= 1
-    nodes[next_free].saved_count = nodes[next_free].count # Save root count
+    nodes.saved_count[next_free] = count[next_free] # Save root count
     return next_free # Return root node index
 
+def limit_code_lengths(nodes, max_bits):
+    """Rescale the counts until no Huffman code is longer than max_bits.
+
+    Each pass halves every count, keeping non-zero counts at least 1, which
+    flattens the tree. The rescaled counts are what output_counts writes,
+    so the expander rebuilds the same limited tree from the usual header.
+    """
+    trial = Nodes()
+    codes = Codes()
+    while True:
+        trial.count[:] = nodes.count
+        convert_tree_to_code(trial, codes, 0, 0, build_tree(trial))
+        if max(codes.code_bits) <= max_bits:
+            return
+        changed = False
+        for i in range(END_OF_STREAM):
+            if nodes.count[i] > 1:
+                nodes.count[i] = (nodes.count[i] + 1) // 2
+                changed = True
+        if not changed:
+            raise Exception(f"Fatal error in LimitCodeLengths! {max_bits} bits is too short for this model.")
+
 def convert_tree_to_code(nodes, codes, code_so_far, bits, node):
     if node <= END_OF_STREAM: # Leaf node (character or EOF)
-        codes[node].code = code_so_far
-        codes[node].code_bits = bits
+        codes.code[node] = code_so_far
+        codes.code_bits[node] = bits
         return
 
     code_so_far <<= 1
     bits = bits + 1
-    #print(f"child0_ttc {nodes[node].child_0}")
-    convert_tree_to_code(nodes, codes, code_so_far, bits, nodes[node].child_0)
-    convert_tree_to_code(nodes, codes, code_so_far | 1, bits, nodes[node].child_1)
+    #print(f"child0_ttc {nodes.child_0[node]}")
+    convert_tree_to_code(nodes, codes, code_so_far, bits, nodes.child_0[node])
+    convert_tree_to_code(nodes, codes, code_so_far | 1, bits, nodes.child_1[node])
 
 def print_char(c):
     if 0x20 <= c < 127:
@@ -271,42 +457,109 @@ def file_print_binary(file: FileIO, code: int, bits: int):
         mask >>= 1
 
 def print_model(nodes, codes):
-    for i in range(513):
-        if nodes[i].saved_count != 0:
+    for i in range(NODE_COUNT):
+        if nodes.saved_count[i] != 0:
             print(f"node=", end="")
             print_char(i)
-            print(f"  count={nodes[i].saved_count:3d}", end="")
+            print(f"  count={nodes.saved_count[i]:3d}", end="")
             
             print("  child_0=", end="")
-            print_char(nodes[i].child_0)
+            print_char(nodes.child_0[i])
             print("  child_1=", end="")
-            print_char(nodes[i].child_1)
+            print_char(nodes.child_1[i])
 
             if codes is not None and i <= END_OF_STREAM:
                 print("  Huffman code=", end="")
-                FilePrintBinary(sys.stdout.buffer, codes[i].code, codes[i].code_bits)
+                FilePrintBinary(sys.stdout.buffer, codes.code[i], codes.code_bits[i])
             
             print() # Newline
 
 
 def compress_data(input_file, output_bit_file, codes):
+    # Each chunk is rendered as one string of '0'/'1' through a per-symbol
+    # table and goes out in a single output_bits call.
+    strings = [format(code, f"0{bits}b") if bits else "" for code, bits in zip(codes.code, codes.code_bits)]
+    lookup = strings.__getitem__
     input_file.seek(0)
-    
+
     while True:
-        c = input_file.read(1)
-        if not c:
+        chunk = input_file.read(CHUNK_SIZE)
+        if not chunk:
             break # EOF
-        c_val = c[0]
-        #print(chr(c[0]))
-        
-        # Output Huffman code for the byte
-        #print(f"{codes[c_val].code}  {codes[c_val].code_bits}")
-        output_bit_file.output_bits(codes[c_val].code, codes[c_val].code_bits)
+        text = "".join(map(lookup, chunk))
+        output_bit_file.output_bits(int(text, 2), len(text))
+        output_bit_file.report(bytes_in=len(chunk))
+
+    output_bit_file.output_bits(codes.code[END_OF_STREAM], codes.code_bits[END_OF_STREAM])
+
 
-    output_bit_file.output_bits(codes[END_OF_STREAM].code, codes[END_OF_STREAM].code_bits)
+def build_decode_table(nodes, root_node):
+    """Flatten the tree into multi-level lookup tables for expand_data.
 
+    The stream uses the codes the tree walk hands out, which are not
+    canonical, so the tables are filled from those exact codes and lengths.
+    A leaf entry holds (symbol << 4) | bits used at that level; a negative
+    entry is ~((base << 4) | width) and points at a subtable.  Returns the
+    flat table and the width of the root level.
+    """
+    codes = Codes()
+    convert_tree_to_code(nodes, codes, 0, 0, root_node)
+    entries = [(codes.code[i], codes.code_bits[i], i)
+               for i in range(END_OF_STREAM + 1) if codes.code_bits[i]]
+    table = []
+
+    def fill(entries, width):
+        base = len(table)
+        table.extend([0] * (1 << width))
+        long_codes = {}
+        for code, bits, symbol in entries:
+            if bits <= width:
+                first = base + (code << (width - bits))
+                table[first:first + (1 << (width - bits))] = [(symbol << 4) | bits] * (1 << (width - bits))
+            else:
+                rest = bits - width
+                long_codes.setdefault(code >> rest, []).append((code & ((1 << rest) - 1), rest, symbol))
+        for prefix, group in long_codes.items():
+            sub_width = min(max(bits for _, bits, _ in group), LOOKUP_BITS)
+            table[base + prefix] = ~((fill(group, sub_width) << 4) | sub_width)
+        return base
+
+    root_width = min(max(bits for _, bits, _ in entries), LOOKUP_BITS)
+    fill(entries, root_width)
+    return table, root_width
 
 def expand_data(input_bit_file, output_file, nodes, root_node):
+    table, root_width = build_decode_table(nodes, root_node)
+    peek_bits = input_bit_file.peek_bits
+    skip_bits = input_bit_file.skip_bits
+    buffer = bytearray()
+    while True:
+        base = 0
+        width = root_width
+        entry = table[peek_bits(width)]
+        while entry < 0:
+            skip_bits(width)
+            entry = ~entry
+            base = entry >> 4
+            width = entry & 15
+            entry = table[base + peek_bits(width)]
+        skip_bits(entry & 15)
+
+        symbol = entry >> 4
+        if symbol == END_OF_STREAM:
+            break # Done
+        buffer.append(symbol)
+        if len(buffer) >= CHUNK_SIZE:
+            output_file.write(buffer)
+            input_bit_file.report(bytes_out=len(buffer))
+            buffer.clear()
+
+    output_file.write(buffer)
+    input_bit_file.report(bytes_out=len(buffer))
+
+def expand_data_by_tree(input_bit_file, output_file, nodes, root_node):
+    """Reference decoder: walk the tree one input bit at a time."""
+    bytes_out = 0
     while True:
         node = root_node
         
@@ -314,9 +567,9 @@ def expand_data(input_bit_file, output_file, nodes, root_node):
         while node > END_OF_STREAM:
             # InputBit is a placeholder function
             if input_bit_file.input_bit():
-                node = nodes[node].child_1 # 1 bit (right)
+                node = nodes.child_1[node] # 1 bit (right)
             else:
-                node = nodes[node].child_0 # 0 bit (left)
+                node = nodes.child_0[node] # 0 bit (left)
 
         # Leaf node found
         if node == END_OF_STREAM:
@@ -326,4 +579,9 @@ def expand_data(input_bit_file, output_file, nodes, root_node):
             output_file.write(bytes([node]))
         except Exception:
             print("Error trying to write expanded byte to output",  LINE())
+        bytes_out += 1
+        if (bytes_out & CompressorBitio.PACIFIER_COUNT) == 0:
+            input_bit_file.report(bytes_out=CompressorBitio.PACIFIER_COUNT + 1)
+
+    input_bit_file.report(bytes_out=bytes_out & CompressorBitio.PACIFIER_COUNT)
 
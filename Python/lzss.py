@@ -1,250 +1,798 @@
 # Bradford Arrington 2025
 
 from bitio import CompressorBitio # as CompressorBitio
-from io import FileIO, SEEK_SET, SEEK_CUR
-from typing import BinaryIO, List
+from array import array
+from io import BytesIO, FileIO, SEEK_SET, SEEK_CUR
+from typing import BinaryIO, List, Sequence
 import sys
 
 
 COMPRESSION_NAME = "LZSS Encoder"
-USAGE = "in-file out-file\n\n"
-	  
-INDEX_BIT_COUNT = 12
-LENGTH_BIT_COUNT = 4
-RAW_LOOK_AHEAD_SIZE = (1 << LENGTH_BIT_COUNT)
-BREAK_EVEN = ((1 + INDEX_BIT_COUNT + LENGTH_BIT_COUNT) // 9)
-LOOK_AHEAD_SIZE = (RAW_LOOK_AHEAD_SIZE + BREAK_EVEN)
+USAGE = ("in-file out-file [-p n] [-c n] [-w n | -i n -l n]\n\n"
+	" -p n sets the parse level: 0 greedy, 1 lazy, 2 optimal\n"
+	" -c n finds matches with hash chains searched n deep\n"
+	" -w n picks window preset n (0-3)\n"
+	" -i n sets the window to 2**n bytes, n up to 20\n"
+	" -l n sets the match length field to n bits\n")
+
+DEFAULT_INDEX_BIT_COUNT = 12
+DEFAULT_LENGTH_BIT_COUNT = 4
+# (index bits, length bits): 4 KiB/17, 16 KiB/33, 64 KiB/258 and 128 KiB/258
+WINDOW_PRESETS = [(12, 4), (14, 5), (16, 8), (17, 8)]
+# Widest window a stream may ask for, 1 MiB, so a hostile header can't make
+# the decoder allocate gigabytes
+MAX_INDEX_BIT_COUNT = 20
+# A stream can only open with a literal or with END_OF_STREAM, so a match
+# token pointing at HEADER_MARKER tells expand_file that the bit counts follow
+HEADER_MARKER = 0xFFF
+HEADER_INDEX_BITS = 5
+HEADER_LENGTH_BITS = 4
+# expand_file hands decoded bytes to the output stream in chunks of this size
+OUTPUT_BUFFER_SIZE = 64 * 1024
 END_OF_STREAM = 0
-
-WINDOW_SIZE = (1 << INDEX_BIT_COUNT)
-TREE_ROOT = WINDOW_SIZE
 UNUSED = 0
 
-class TreeNode:
-	"""Represents a node in the binary tree"""
-	__slots__ = ['parent', 'smaller_child', 'larger_child']
-	def __init__(self):
-		self.parent = 0  # Use 0 instead of UNUSED during initialization
-		self.smaller_child = 0
-		self.larger_child = 0
-
-#def __init__(self):
-window = [0] * WINDOW_SIZE
-tree = [TreeNode() for _ in range(WINDOW_SIZE + 1)]
-
-def debug_window_content(self, position, length=10):
-	"""Debug method to check window content types"""
-	print(f"Window content around position {position}:")
-	for i in range(max(0, position-5), min(len(self.window), position+5)):
-		val = self.window[i]
-		print(f"  window[{i}] = {val} (type: {type(val)})")
-
-def MOD_WINDOW(a):
-	"""Perform arithmetic on tree indices"""
-	return a & (WINDOW_SIZE - 1)
-
-def InitTree(r):
-	tree[TREE_ROOT].larger_child = r
-	tree[r].parent = TREE_ROOT
-	tree[r].larger_child = UNUSED
-	tree[r].smaller_child = UNUSED
-
-
-def ContractNode( old_node, new_node):
-
-	tree[new_node].parent = tree[old_node].parent
-	parent = tree[old_node].parent
-	if tree[parent].larger_child == old_node:
-		tree[parent].larger_child = new_node
-	else:
-		tree[parent].smaller_child = new_node
-	tree[old_node].parent = UNUSED
-
-
-def ReplaceNode( old_node, new_node):
-
-	parent = tree[old_node].parent
-	if tree[parent].smaller_child == old_node:
-		tree[parent].smaller_child = new_node
-	else:
-		tree[parent].larger_child = new_node
-	
-		# Copy all attributes from old_node to new_node
-	tree[new_node].parent = tree[old_node].parent
-	tree[new_node].smaller_child = tree[old_node].smaller_child
-	tree[new_node].larger_child = tree[old_node].larger_child
-	
-		# Update parent references of children
-	if tree[new_node].smaller_child != UNUSED:
-		tree[tree[new_node].smaller_child].parent = new_node
-	if tree[new_node].larger_child != UNUSED:
-		tree[tree[new_node].larger_child].parent = new_node
-	
-	tree[old_node].parent = UNUSED
-
-
-def FindNextNode( node):
-	next_node = tree[node].smaller_child
-	while tree[next_node].larger_child != UNUSED:
-		next_node = tree[next_node].larger_child
-	return next_node
-
-
-def DeleteString( p):
-	if tree[p].parent == UNUSED:
-		return
-	
-	if tree[p].larger_child == UNUSED:
-		ContractNode(p, tree[p].smaller_child)
-	elif tree[p].smaller_child == UNUSED:
-		ContractNode(p, tree[p].larger_child)
-	else:
-		replacement = FindNextNode(p)
-		DeleteString(replacement)
-		ReplaceNode(p, replacement)
-
-
-def AddString( new_node, match_position):
+PARSE_GREEDY = 0
+PARSE_LAZY = 1
+PARSE_OPTIMAL = 2
+# Positions the optimal parse plans over at a time
+OPTIMAL_BLOCK_SIZE = 4096
+CHUNK_SIZE = 64 * 1024
+
+def check_bit_counts(index_bit_count: int, length_bit_count: int) -> int:
+	"""Reject token widths the stream can't use and return the break-even length."""
+	if not 1 <= length_bit_count < (1 << HEADER_LENGTH_BITS):
+		raise Exception(f"Fatal error in lzss! Bad length bit count {length_bit_count}.")
+	break_even = (1 + index_bit_count + length_bit_count) // 9
+	if not 0 < index_bit_count <= MAX_INDEX_BIT_COUNT or (1 << index_bit_count) <= 2 * ((1 << length_bit_count) + break_even):
+		raise Exception(f"Fatal error in lzss! Bad index bit count {index_bit_count}.")
+	return break_even
+
+
+class TreeMatchFinder:
+	"""The book's binary search tree over every string in the window.
+
+	A match finder sees the window through four calls: init() seeds it
+	with the first string, delete() drops the string about to be
+	overwritten, insert() adds the string at a position and returns
+	(match_length, match_position) for the longest earlier match, and
+	find() returns that match without adding the string.
+
+	The nodes live in three parallel columns indexed by window position,
+	with the root one past the end of the window.
+	"""
+	def __init__(self, encoder: 'LzssEncoder'):
+		self.window = encoder.window
+		self.mask = encoder.window_size - 1
+		self.look_ahead_size = encoder.look_ahead_size
+		self.tree_root = encoder.window_size
+		self.typecode = "H" if self.tree_root <= 0xFFFF else "I"
+		self.parent = self.smaller_child = self.larger_child = None
+
+	def init(self, position):
+		empty = array(self.typecode, [UNUSED])
+		self.parent = empty * (self.tree_root + 1)
+		self.smaller_child = empty * (self.tree_root + 1)
+		self.larger_child = empty * (self.tree_root + 1)
+		self.InitTree(position)
+
+	def delete(self, position):
+		self.DeleteString(position)
+
+	def insert(self, position):
+		return self.AddString(position)
+
+	def find(self, position):
+		window = self.window
+		mask = self.mask
+		look_ahead_size = self.look_ahead_size
+		smaller_child = self.smaller_child
+		larger_child = self.larger_child
+		test_node = larger_child[self.tree_root]
+		match_length = 0
+		match_position = 0
+
+		while test_node != UNUSED:
+			i = 0
+			delta = 0
+			while i < look_ahead_size:
+				delta = window[(position + i) & mask] - window[(test_node + i) & mask]
+				if delta != 0:
+					break
+				i += 1
+
+			if i > match_length:
+				match_length = i
+				match_position = test_node
+				if match_length >= look_ahead_size:
+					break
 
-	if new_node == END_OF_STREAM:
-		return 0
-	
-	test_node = tree[TREE_ROOT].larger_child
-	match_length = 0
-	
-	while True:
-			# Compare strings in the window
-		i = 0
-		while i < LOOK_AHEAD_SIZE:
-				#delta = (self.window[self.MOD_WINDOW(new_node + i)] - self.window[self.MOD_WINDOW(test_node + i)])
-			new_node_val = window[MOD_WINDOW(new_node + i)]
-			test_node_val = window[MOD_WINDOW(test_node + i)]
-			delta = new_node_val - test_node_val
-			if delta != 0:
-				break
-			i += 1
-		
-		if i >= match_length:
-			match_length = i
-			match_position[0] = test_node  # Update the reference
-			if match_length >= LOOK_AHEAD_SIZE:
-				ReplaceNode(test_node, new_node)
-				return match_length
-
-		if delta >= 0:
-			child = tree[test_node].larger_child
-		else:
-			child = tree[test_node].smaller_child
-		
-		if child == UNUSED:
-				# Add new node to the tree
 			if delta >= 0:
-				tree[test_node].larger_child = new_node
+				test_node = larger_child[test_node]
 			else:
-				tree[test_node].smaller_child = new_node
-			
-			tree[new_node].parent = test_node
-			tree[new_node].larger_child = UNUSED
-			tree[new_node].smaller_child = UNUSED
-			return match_length
-		
-		test_node = child
-
-def compress_file(input_stream: FileIO, output: 'Compressor.BitFile', argc: int, argv: list[str]):
-	i: int
-	c: int 
-	look_ahead_bytes: int = 0
-	current_position: int = 1
-	replace_count: int
-	match_length: int
-	match_position: int
+				test_node = smaller_child[test_node]
+		return match_length, match_position
+
+	def InitTree(self, r):
+		self.larger_child[self.tree_root] = r
+		self.parent[r] = self.tree_root
+		self.larger_child[r] = UNUSED
+		self.smaller_child[r] = UNUSED
+
+	def ContractNode(self, old_node, new_node):
+		parent = self.parent
+		parent[new_node] = parent[old_node]
+		p = parent[old_node]
+		if self.larger_child[p] == old_node:
+			self.larger_child[p] = new_node
+		else:
+			self.smaller_child[p] = new_node
+		parent[old_node] = UNUSED
+
+	def ReplaceNode(self, old_node, new_node):
+		parent = self.parent
+		smaller_child = self.smaller_child
+		larger_child = self.larger_child
+		p = parent[old_node]
+		if smaller_child[p] == old_node:
+			smaller_child[p] = new_node
+		else:
+			larger_child[p] = new_node
+
+			# Copy all links from old_node to new_node
+		parent[new_node] = p
+		smaller_child[new_node] = smaller_child[old_node]
+		larger_child[new_node] = larger_child[old_node]
+
+			# Update parent references of children
+		if smaller_child[new_node] != UNUSED:
+			parent[smaller_child[new_node]] = new_node
+		if larger_child[new_node] != UNUSED:
+			parent[larger_child[new_node]] = new_node
+
+		parent[old_node] = UNUSED
+
+	def FindNextNode(self, node):
+		larger_child = self.larger_child
+		next_node = self.smaller_child[node]
+		while larger_child[next_node] != UNUSED:
+			next_node = larger_child[next_node]
+		return next_node
+
+	def DeleteString(self, p):
+		if self.parent[p] == UNUSED:
+			return
+
+		if self.larger_child[p] == UNUSED:
+			self.ContractNode(p, self.smaller_child[p])
+		elif self.smaller_child[p] == UNUSED:
+			self.ContractNode(p, self.larger_child[p])
+		else:
+			replacement = self.FindNextNode(p)
+			self.DeleteString(replacement)
+			self.ReplaceNode(p, replacement)
+
+	def AddString(self, new_node):
+		if new_node == END_OF_STREAM:
+			return 0, 0
+
+		window = self.window
+		mask = self.mask
+		look_ahead_size = self.look_ahead_size
+		smaller_child = self.smaller_child
+		larger_child = self.larger_child
+		test_node = larger_child[self.tree_root]
+		match_length = 0
+		match_position = 0
+
+		while True:
+				# Compare strings in the window
+			i = 0
+			delta = 0
+			while i < look_ahead_size:
+				delta = window[(new_node + i) & mask] - window[(test_node + i) & mask]
+				if delta != 0:
+					break
+				i += 1
+
+			if i >= match_length:
+				match_length = i
+				match_position = test_node
+				if match_length >= look_ahead_size:
+					self.ReplaceNode(test_node, new_node)
+					return match_length, match_position
 
-	current_position = 1
-	for i in range(LOOK_AHEAD_SIZE):
-		c = input_stream.read(1)
-		if not c:
-			break
-
-		byte_value = c[0] if isinstance(c, bytes) else ord(c)
-		window[ current_position + i ] = byte_value
-		look_ahead_bytes = i + 1
-
-		#look_ahead_bytes = i
-	InitTree( current_position )
-	match_length = 0
-	match_position = [0] # Use list for pass-by-reference
-
-	while look_ahead_bytes > 0:
-		if match_length > look_ahead_bytes:
-			match_length = look_ahead_bytes
-
-		if match_length <= BREAK_EVEN:
-			replace_count = 1
-			output.output_bit( 1 )  # Flag for literal
-			literal_value = window[current_position]
-			output.output_bits( literal_value, 8 )
+			if delta >= 0:
+				child = larger_child[test_node]
+			else:
+				child = smaller_child[test_node]
+
+			if child == UNUSED:
+					# Add new node to the tree
+				if delta >= 0:
+					larger_child[test_node] = new_node
+				else:
+					smaller_child[test_node] = new_node
+
+				self.parent[new_node] = test_node
+				larger_child[new_node] = UNUSED
+				smaller_child[new_node] = UNUSED
+				return match_length, match_position
+
+			test_node = child
+
+
+class HashChainMatchFinder:
+	"""Hash chains keyed on each string's first three bytes.
+
+	Only the max_chain most recent strings with the same prefix are
+	compared, which trades ratio for speed. Chains hold absolute positions,
+	so strings that have slid out of the window are recognised by their
+	distance. delete() only drops a head that still points at the string
+	sliding out, which keeps head down to the prefixes in the window.
+	"""
+	def __init__(self, encoder: 'LzssEncoder', max_chain: int = 16):
+		self.window = encoder.window
+		self.window_size = encoder.window_size
+		self.look_ahead_size = encoder.look_ahead_size
+		self.max_chain = max_chain
+		self.head = {}
+		self.prev = [0] * encoder.window_size
+		self.keys = [-1] * encoder.window_size
+		self.base = 0
+		self.last = 0
+
+	def init(self, position):
+		self.head.clear()
+		self.base = 0
+		self.last = position
+		self.insert(position)
+
+	def delete(self, position):
+		# Every later string with this prefix would have taken over the head,
+		# so a head still on position has a whole chain out of reach.
+		key = self.keys[position]
+		head = self.head.get(key)
+		if head is not None and head & (self.window_size - 1) == position:
+			del self.head[key]
+
+	def insert(self, position):
+		if position == END_OF_STREAM:
+			return 0, 0
+		if position <= self.last and self.head:
+			self.base += self.window_size
+		self.last = position
+		absolute = self.base + position
+		key, match_length, match_position = self.search(position, absolute)
+		self.prev[position] = self.head.get(key, -1)
+		self.keys[position] = key
+		self.head[key] = absolute
+		return match_length, match_position
+
+	def find(self, position):
+		absolute = self.base + position
+		if position <= self.last:
+			absolute += self.window_size
+		return self.search(position, absolute)[1:]
+
+	def search(self, position, absolute):
+		"""Walk the chain for the string at position; return its key and longest match."""
+		window = self.window
+		mask = self.window_size - 1
+		look_ahead_size = self.look_ahead_size
+		oldest = max(absolute - (self.window_size - look_ahead_size), 0)
+		key = (window[position] << 16) | (window[(position + 1) & mask] << 8) | window[(position + 2) & mask]
+
+		match_length = 0
+		match_position = 0
+		candidate = self.head.get(key, -1)
+		depth = self.max_chain
+		while candidate >= oldest and depth > 0:
+			test_node = candidate & mask
+			i = 3
+			while i < look_ahead_size and window[(position + i) & mask] == window[(test_node + i) & mask]:
+				i += 1
+			if i > match_length:
+				match_length = i
+				match_position = test_node
+				if i >= look_ahead_size:
+					break
+			candidate = self.prev[test_node]
+			depth -= 1
+		return key, match_length, match_position
+
+
+class LzssEncoder:
+	"""Window, match finder and parse settings for LZSS compression.
+
+	One encoder compresses any number of streams, one after another.
+	"""
+	def __init__(self, index_bit_count: int = DEFAULT_INDEX_BIT_COUNT, length_bit_count: int = DEFAULT_LENGTH_BIT_COUNT,
+			parse_level: int = PARSE_GREEDY, max_chain: int = 0):
+		self.break_even = check_bit_counts(index_bit_count, length_bit_count)
+		self.index_bit_count = index_bit_count
+		self.length_bit_count = length_bit_count
+		self.look_ahead_size = (1 << length_bit_count) + self.break_even
+		self.window_size = 1 << index_bit_count
+		self.window = bytearray(self.window_size)
+		self.parse_level = parse_level
+		if max_chain:
+			self.finder = HashChainMatchFinder(self, max_chain)
 		else:
+			self.finder = TreeMatchFinder(self)
+
+	def debug_window_content(self, position, length=10):
+		"""Debug method to check window content types"""
+		print(f"Window content around position {position}:")
+		for i in range(max(0, position-5), min(len(self.window), position+5)):
+			val = self.window[i]
+			print(f"  window[{i}] = {val} (type: {type(val)})")
+
+	def compress(self, input_stream: FileIO, output: 'Compressor.BitFile'):
+		self.start_compress(output)
+		while True:
+			chunk = input_stream.read(CHUNK_SIZE)
+			if not chunk:
+				break
+			self.write(chunk)
+		self.finish()
+
+	def start_compress(self, output: 'Compressor.BitFile'):
+		"""Begin a stream on output; feed it with write() and end it with finish()."""
+		self.output = output
+		# The book's 12/4 stream stays headerless so it still matches the C tools
+		if (self.index_bit_count, self.length_bit_count) != (DEFAULT_INDEX_BIT_COUNT, DEFAULT_LENGTH_BIT_COUNT):
 			output.output_bit( 0 )
-			output.output_bits( match_position[0], INDEX_BIT_COUNT )
-			length_value = match_length - (BREAK_EVEN + 1) # need ??
-			output.output_bits( length_value, LENGTH_BIT_COUNT )
-			replace_count = match_length
-
-		for i in range(replace_count):
+			output.output_bits( HEADER_MARKER, DEFAULT_INDEX_BIT_COUNT )
+			output.output_bits( self.index_bit_count, HEADER_INDEX_BITS )
+			output.output_bits( self.length_bit_count, HEADER_LENGTH_BITS )
+
+		# Clear what a previous stream left, so every stream compresses alike
+		self.window[:] = bytes(self.window_size)
+		self.pending = bytearray()
+		self.started = False
+		self.current_position = 1
+		self.look_ahead_bytes = 0
+		self.match_length = 0
+		self.match_position = 0
+		self.held_length = 0
+		self.held_position = 0
+		self.literals = []
+		self.lengths = []
+		self.positions = []
+
+	def write(self, data):
+		self.pending += data
+		self.encode(False)
+
+	def finish(self):
+		self.encode(True)
+		self.output.output_bit( 0 )
+		self.output.output_bits( END_OF_STREAM, self.index_bit_count )
+		self.output.report(bytes_in=self.current_position - 1)
+
+	def encode(self, final: bool):
+		"""Code as much of the pending input as the parse can commit to.
+
+		Until final, each step only runs while the input it could consume
+		(a look-ahead, or an optimal parse block and its look-ahead) is
+		already pending, so the output doesn't depend on how the input was
+		split up.
+		"""
+		i: int
+		look_ahead_bytes: int
+		current_position: int
+		match_length: int
+		match_position: int
+
+		window = self.window
+		finder = self.finder
+		output = self.output
+		pending = self.pending
+		index_bit_count = self.index_bit_count
+		length_bit_count = self.length_bit_count
+		break_even = self.break_even
+		look_ahead_size = self.look_ahead_size
+		window_size = self.window_size
+		mask = window_size - 1
+		parse_level = self.parse_level
+		needed = OPTIMAL_BLOCK_SIZE + look_ahead_size if parse_level == PARSE_OPTIMAL else look_ahead_size
+		read_position = 0
+
+		if not self.started:
+			if len(pending) < look_ahead_size and not final:
+				return
+			read_position = min(look_ahead_size, len(pending))
+			window[1:1 + read_position] = pending[:read_position]
+			self.look_ahead_bytes = read_position
+			finder.init( self.current_position )
+			self.started = True
+
+		look_ahead_bytes = self.look_ahead_bytes
+		current_position = self.current_position
+		match_length = self.match_length
+		match_position = self.match_position
+		end = len(pending) if final else len(pending) - needed
+
+		def advance():
+			"""Slide the window one byte and return the match at the new position."""
+			nonlocal current_position, look_ahead_bytes, read_position
 				# Delete the string that will be overwritten
-			delete_pos = MOD_WINDOW(current_position + LOOK_AHEAD_SIZE)
-			if delete_pos < len(tree):  # Safety check
-				DeleteString(delete_pos)
+			finder.delete((current_position + look_ahead_size) & mask)
 
-			c = input_stream.read(1)
-			if not c:
+			if read_position == len(pending):
 				look_ahead_bytes -= 1
 			else:
-				new_pos = MOD_WINDOW(current_position + LOOK_AHEAD_SIZE)
-				byte_value = c[0] if isinstance(c, bytes) else ord(c)
-				window[new_pos] = byte_value
+				window[(current_position + look_ahead_size) & mask] = pending[read_position]
+				read_position += 1
 
-			current_position = MOD_WINDOW( current_position + 1 )
+			current_position = (current_position + 1) & mask
+			if current_position == 0:
+				output.report(bytes_in=window_size)
 			if look_ahead_bytes > 0:
-				match_length = AddString( current_position, match_position )
+				return finder.insert( current_position )
+			return 0, 0
+
+		def output_literal(literal_value):
+			output.output_bit( 1 )  # Flag for literal
+			output.output_bits( literal_value, 8 )
+
+		def output_pair(match_position, match_length):
+			output.output_bit( 0 )
+			output.output_bits( match_position, index_bit_count )
+			output.output_bits( match_length - (break_even + 1), length_bit_count )
+
+		if parse_level == PARSE_GREEDY:
+			while look_ahead_bytes > 0 and read_position <= end:
+				if match_length > look_ahead_bytes:
+					match_length = look_ahead_bytes
+
+				if match_length <= break_even:
+					replace_count = 1
+					output_literal(window[current_position])
+				else:
+					output_pair(match_position, match_length)
+					replace_count = match_length
+
+				for i in range(replace_count):
+					match_length, match_position = advance()
+
+		elif parse_level == PARSE_LAZY:
+			# A match is held back one byte; if the next position matches longer,
+			# the held byte goes out as a literal and the longer match is held instead
+			held_length = self.held_length
+			held_position = self.held_position
+			while look_ahead_bytes > 0 and read_position <= end:
+				if match_length > look_ahead_bytes:
+					match_length = look_ahead_bytes
+
+				if held_length > break_even:
+					if held_length >= match_length:
+						output_pair(held_position, held_length)
+						for i in range(held_length - 1):
+							match_length, match_position = advance()
+						held_length = 0
+						continue
+					output_literal(window[(current_position - 1) & mask])
+					held_length = 0
+
+				if match_length <= break_even:
+					output_literal(window[current_position])
+					match_length, match_position = advance()
+				elif match_length >= look_ahead_size or match_length >= look_ahead_bytes:
+					# Nothing can beat it, so send it now
+					output_pair(match_position, match_length)
+					for i in range(match_length):
+						match_length, match_position = advance()
+				else:
+					held_length, held_position = match_length, match_position
+					match_length, match_position = advance()
+			self.held_length = held_length
+			self.held_position = held_position
+
+		else:
+			# Gather the longest match at every position of a block and one
+			# look-ahead past it, then pick the cheapest literal/pair path through
+			# them. Only tokens that start inside the block are sent; the rest is
+			# planned again with the next block. A pair may be cut short, since
+			# any prefix of a match is also a match.
+			literal_bits = 1 + 8
+			pair_bits = 1 + index_bit_count + length_bit_count
+			literals = self.literals
+			lengths = self.lengths
+			positions = self.positions
+			while (look_ahead_bytes > 0 or lengths) and read_position <= end:
+				while look_ahead_bytes > 0 and len(lengths) < needed:
+					literals.append(window[current_position])
+					lengths.append(min(match_length, look_ahead_bytes))
+					positions.append(match_position)
+					match_length, match_position = advance()
+					# Slot 0 marks the end of the stream, so the finder never
+					# holds it, but the string there can still be matched.
+					if current_position == END_OF_STREAM and look_ahead_bytes > 0:
+						match_length, match_position = finder.find(current_position)
+
+				count = len(lengths)
+				cost = [0] * (count + 1)
+				step = [1] * count
+				for i in range(count - 1, -1, -1):
+					best = cost[i + 1] + literal_bits
+					longest = min(lengths[i], count - i)
+					if longest > break_even:
+						# Scan from the longest length down, so ties go to the longest pair
+						reachable = cost[i + longest:i + break_even:-1]
+						cheapest = min(reachable)
+						if cheapest + pair_bits < best:
+							best = cheapest + pair_bits
+							step[i] = longest - reachable.index(cheapest)
+					cost[i] = best
+
+				block_end = count if look_ahead_bytes == 0 else OPTIMAL_BLOCK_SIZE
+				i = 0
+				while i < block_end:
+					if step[i] == 1:
+						output_literal(literals[i])
+					else:
+						output_pair(positions[i], step[i])
+					i += step[i]
+				del literals[:i]
+				del lengths[:i]
+				del positions[:i]
+
+		del pending[:read_position]
+		self.look_ahead_bytes = look_ahead_bytes
+		self.current_position = current_position
+		self.match_length = match_length
+		self.match_position = match_position
+
+
+class LzssCompressor:
+	"""Incremental LZSS compression in the style of zlib.compressobj.
+
+	compress() returns the whole bytes coded so far and flush() ends the
+	stream. Between calls only the window, the match finder's tables, which
+	hold at most one entry per window slot, and at most one look-ahead (or
+	one optimal parse block and its look-ahead) of input are held.
+	"""
+	def __init__(self, index_bit_count: int = DEFAULT_INDEX_BIT_COUNT, length_bit_count: int = DEFAULT_LENGTH_BIT_COUNT,
+			parse_level: int = PARSE_GREEDY, max_chain: int = 0):
+		self.output = CompressorBitio.BitFile.open_output_bit_buffer()
+		self.encoder = LzssEncoder(index_bit_count, length_bit_count, parse_level, max_chain)
+		self.encoder.start_compress(self.output)
+
+	def compress(self, data) -> bytes:
+		self.encoder.write(data)
+		return self.output.take_bytes()
+
+	def flush(self) -> bytes:
+		self.encoder.finish()
+		self.output.close_bit_file()
+		return self.output.take_bytes()
 
-	output.output_bit( 0 )
-	output.output_bits( END_OF_STREAM, INDEX_BIT_COUNT )
 
+def compress_file(input_stream: FileIO, output: 'Compressor.BitFile', argc: int, argv: list[str]):
+	max_chain = 0
+	parse_level = PARSE_GREEDY
+	index_bit_count, length_bit_count = DEFAULT_INDEX_BIT_COUNT, DEFAULT_LENGTH_BIT_COUNT
 	while argc > 0:
+		if argv[0] == "-c" and argc > 1:
+			max_chain = int(argv[1])
+			argc -= 1
+			argv = argv[1:]
+		elif argv[0] == "-p" and argc > 1:
+			parse_level = int(argv[1])
+			argc -= 1
+			argv = argv[1:]
+		elif argv[0] == "-w" and argc > 1:
+			preset = int(argv[1])
+			if not 0 <= preset < len(WINDOW_PRESETS):
+				raise Exception(f"Fatal error in lzss! Bad window preset {preset}.")
+			index_bit_count, length_bit_count = WINDOW_PRESETS[preset]
+			argc -= 1
+			argv = argv[1:]
+		elif argv[0] == "-i" and argc > 1:
+			index_bit_count = int(argv[1])
 			argc -= 1
-			print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
+			argv = argv[1:]
+		elif argv[0] == "-l" and argc > 1:
+			length_bit_count = int(argv[1])
+			argc -= 1
+			argv = argv[1:]
+		else:
+			print(f"Unknown argument: {argv[0]}")
+		argc -= 1
+		argv = argv[1:]
+
+	LzssEncoder(index_bit_count, length_bit_count, parse_level, max_chain).compress(input_stream, output)
+
+
+def copy_match(history: bytearray, current_position: int, match_position: int, match_length: int) -> bytearray:
+	"""Copy a match to current_position in the circular window and return its bytes."""
+	window_size = len(history)
+	distance = (current_position - match_position) & (window_size - 1)
+	if distance == 0 or distance >= match_length:
+		# The source is read before any of it can be overwritten
+		end = match_position + match_length
+	else:
+		# The match runs into its own output, so it repeats every distance bytes
+		end = match_position + distance
+	if end <= window_size:
+		data = history[match_position:end]
+	else:
+		data = history[match_position:] + history[:end - window_size]
+	if len(data) < match_length:
+		data = (data * (match_length // distance + 1))[:match_length]
+
+	end = current_position + match_length
+	if end <= window_size:
+		history[current_position:end] = data
+	else:
+		split = window_size - current_position
+		history[current_position:] = data[:split]
+		history[:end - window_size] = data[split:]
+	return data
+
+
+class LzssDecompressor:
+	"""Incremental LZSS expansion in the style of zlib.decompressobj.
+
+	decompress() takes the stream in pieces of any size and returns the
+	bytes they complete. Between calls only the window and the bits of an
+	unfinished token are held. Once the stream has ended eof is set and
+	any bytes after it are kept in unused_data.
+	"""
+	def __init__(self):
+		self.eof = False
+		self.unused_data = b""
+		self.bits = 0
+		self.bit_count = 0
+		self.index_bit_count = 0
+		self.length_bit_count = 0
+		self.break_even = 0
+		self.history = None
+		self.current_position = 1
+
+	def decompress(self, data) -> bytes:
+		output = bytearray()
+		if self.eof:
+			self.unused_data += bytes(data)
+			return bytes(output)
+		bits = self.bits
+		bit_count = self.bit_count
+		history = self.history
+		index_bit_count = self.index_bit_count
+		length_bit_count = self.length_bit_count
+		pair_bits = 1 + index_bit_count + length_bit_count
+		current_position = self.current_position
+		read_position = 0
+		size = len(data)
+		while True:
+			# Longest token: 1 + 31 index bits + 15 length bits
+			if bit_count < 48 and read_position < size:
+				take = min(8, size - read_position)
+				bits = (bits << (take << 3)) | int.from_bytes(data[read_position:read_position + take], "big")
+				bit_count += take << 3
+				read_position += take
+				continue
+
+			if history is None:
+				if bit_count < 1 + DEFAULT_INDEX_BIT_COUNT:
+					break
+				index_bit_count, length_bit_count = DEFAULT_INDEX_BIT_COUNT, DEFAULT_LENGTH_BIT_COUNT
+				if bits >> (bit_count - 1 - DEFAULT_INDEX_BIT_COUNT) == HEADER_MARKER:
+					if bit_count < 1 + DEFAULT_INDEX_BIT_COUNT + HEADER_INDEX_BITS + HEADER_LENGTH_BITS:
+						break
+					bit_count -= 1 + DEFAULT_INDEX_BIT_COUNT + HEADER_INDEX_BITS
+					index_bit_count = (bits >> bit_count) & ((1 << HEADER_INDEX_BITS) - 1)
+					bit_count -= HEADER_LENGTH_BITS
+					length_bit_count = (bits >> bit_count) & ((1 << HEADER_LENGTH_BITS) - 1)
+					bits &= (1 << bit_count) - 1
+				self.break_even = check_bit_counts(index_bit_count, length_bit_count)
+				self.index_bit_count = index_bit_count
+				self.length_bit_count = length_bit_count
+				pair_bits = 1 + index_bit_count + length_bit_count
+				history = self.history = bytearray(1 << index_bit_count)
+				continue
+
+			if bit_count == 0:
+				break
+			if bits >> (bit_count - 1):
+				if bit_count < 9:
+					break
+				bit_count -= 9
+				c = (bits >> bit_count) & 0xFF
+				output.append(c)
+				history[ current_position ] = c
+				current_position = (current_position + 1) & (len(history) - 1)
+			else:
+				if bit_count < 1 + index_bit_count:
+					break
+				match_position = bits >> (bit_count - 1 - index_bit_count)
+				if match_position == END_OF_STREAM:
+					self.eof = True
+					# Past the end's padding, give back the whole bytes already buffered
+					bit_count -= 1 + index_bit_count
+					bit_count -= bit_count & 7
+					self.unused_data = (bits & ((1 << bit_count) - 1)).to_bytes(bit_count >> 3, "big") + bytes(data[read_position:])
+					bit_count = 0
+					break
+				if bit_count < pair_bits:
+					break
+				bit_count -= pair_bits
+				match_length = ((bits >> bit_count) & ((1 << length_bit_count) - 1)) + self.break_even + 1
+				output += copy_match(history, current_position, match_position, match_length)
+				current_position = (current_position + match_length) & (len(history) - 1)
+			bits &= (1 << bit_count) - 1
+
+		self.bits = bits & ((1 << bit_count) - 1)
+		self.bit_count = bit_count
+		self.current_position = current_position
+		return bytes(output)
 
 
 def expand_file( input_stream: 'Compressor.BitFile', output_stream: FileIO, argc: int, argv: list[str]):
-	i: int = 0
 	current_position: int
 	c: int
 	match_length: int
 	match_position: int
 	current_position = 1
 
+	index_bit_count, length_bit_count = DEFAULT_INDEX_BIT_COUNT, DEFAULT_LENGTH_BIT_COUNT
+	if input_stream.peek_bits(1 + DEFAULT_INDEX_BIT_COUNT) == HEADER_MARKER:
+		input_stream.skip_bits(1 + DEFAULT_INDEX_BIT_COUNT)
+		index_bit_count = input_stream.input_bits( HEADER_INDEX_BITS )
+		length_bit_count = input_stream.input_bits( HEADER_LENGTH_BITS )
+	break_even = check_bit_counts(index_bit_count, length_bit_count)
+	window_size = 1 << index_bit_count
+
+	history = bytearray(window_size)
+	mask = window_size - 1
+	output = bytearray()
+	input_bits = input_stream.input_bits
 	while True:
 		if input_stream.input_bit():
+			c = input_bits( 8 )
+			output.append(c)
+			history[ current_position ] = c
 
-			c = input_stream.input_bits(  8 )
-			output_stream.write(bytes([c]))
-			window[ current_position ] = ord(chr(c))
-
-			current_position = MOD_WINDOW( current_position + 1 )
+			current_position = (current_position + 1) & mask
+			if current_position == 0:
+				input_stream.report(bytes_out=window_size)
 		else:
-			match_position = input_stream.input_bits( INDEX_BIT_COUNT )
+			match_position = input_bits( index_bit_count )
 			if match_position == END_OF_STREAM:
 				break
-			match_length = input_stream.input_bits( LENGTH_BIT_COUNT )
-			match_length += BREAK_EVEN
-			i = 0
-			for i in range(match_length+1):
-				c = window[ MOD_WINDOW( match_position + i ) ]
-				output_stream.write(bytes([c]))
-				window[ current_position ] = ord(chr(c))
-				current_position = MOD_WINDOW( current_position + 1 )
+			match_length = input_bits( length_bit_count ) + break_even + 1
+			data = copy_match(history, current_position, match_position, match_length)
+			current_position += match_length
+			if current_position >= window_size:
+				current_position -= window_size
+				input_stream.report(bytes_out=window_size)
+			output += data
+
+		if len(output) >= OUTPUT_BUFFER_SIZE:
+			output_stream.write(output)
+			output.clear()
+
+	output_stream.write(output)
+	input_stream.report(bytes_out=current_position - 1)
 
 	while argc > 0:
 		argc -= 1
-		print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
\ No newline at end of file
+		print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
+
+
+def compress_bytes(data, argv: Sequence[str] = ()) -> bytearray:
+	"""Compress an in-memory buffer without touching the filesystem."""
+	output = CompressorBitio.BitFile.open_output_bit_buffer()
+	compress_file(BytesIO(data), output, len(argv), argv)
+	output.close_bit_file()
+	return output.getvalue()
+
+
+def expand_bytes(data, argv: Sequence[str] = ()) -> bytes:
+	input_stream = CompressorBitio.BitFile.open_input_bit_buffer(data)
+	output_stream = BytesIO()
+	expand_file(input_stream, output_stream, len(argv), argv)
+	input_stream.close_bit_file()
+	return output_stream.getvalue()
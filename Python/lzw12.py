@@ -1,151 +1,237 @@
 # Bradford Arrington 2025
 import sys
-from io import FileIO, SEEK_SET, SEEK_CUR
-from dataclasses import dataclass
+from array import array
+from io import BytesIO, FileIO, SEEK_SET, SEEK_CUR
+from typing import Sequence
+from bitio import CompressorBitio
 
 
-@dataclass
-class DictionaryEntry:
-    def __init__(self):
-        self.code_value: int = 0
-        self.parent_code: int = 0
-        self.character: str = ''
-
 class Compressor:
     COMPRESSION_NAME = "LZW 12 Bit Encoder"
-    USAGE = "in-file out-file\n\n"
+    USAGE = "in-file out-file [-k]\n\n -k finds strings with a Python dict instead of the book's hash table\n"
     BITS = 12
     MAX_CODE = (1 << BITS) - 1
     TABLE_SIZE = 5021
     END_OF_STREAM = 256
     FIRST_CODE = 257
     UNUSED = -1
+    CHUNK_SIZE = 64 * 1024
+    # expand_file keeps each code's whole string while the total stays under
+    # this many bytes; later codes are rebuilt from their parents as needed
+    CACHE_BYTES = 1 << 22
 
-    dict_entries = [DictionaryEntry() for _ in range(TABLE_SIZE)]
+    def __init__(self):
+        self.initialize_dictionary()
 
-    decode_stack = [''] * TABLE_SIZE
+    def initialize_dictionary(self):
+        """Empty the dictionary: three parallel columns indexed by table slot."""
+        self.code_value = array("h", [Compressor.UNUSED]) * Compressor.TABLE_SIZE
+        self.parent_code = array("h", [0]) * Compressor.TABLE_SIZE
+        self.character = bytearray(Compressor.TABLE_SIZE)
 
-    @staticmethod
-    def find_child_node(parent_code: int, child_character: int) -> int:
+    def find_child_node(self, parent_code: int, child_character: int) -> int:
+        code_value = self.code_value
         index: int = (child_character << (Compressor.BITS - 8)) ^ parent_code
         offset: int = 1 if index == 0 else Compressor.TABLE_SIZE - index
 
         while True:
-            if Compressor.dict_entries[index].code_value == Compressor.UNUSED:
+            if code_value[index] == Compressor.UNUSED:
                 return index
 
-            if (Compressor.dict_entries[index].parent_code == parent_code and
-                    Compressor.dict_entries[index].character == chr(child_character)):
+            if self.parent_code[index] == parent_code and self.character[index] == child_character:
                 return index
 
             index -= offset
             if index < 0:
                 index += Compressor.TABLE_SIZE
 
-    @staticmethod
-    def decode_string(count: int, code: int) -> int:
-        while code > 255:
-            Compressor.decode_stack[count] = Compressor.dict_entries[code].character
-            count += 1
-            code = Compressor.dict_entries[code].parent_code
-
-        Compressor.decode_stack[count] = chr(code)
-        count += 1
-        return count
+    def decode_string(self, code: int, strings: list) -> bytes:
+        """Expand a code the cache has no room for: walk parents up to a cached string."""
+        suffix = bytearray()
+        while strings[code] is None:
+            suffix.append(self.character[code])
+            code = self.parent_code[code]
+        suffix.reverse()
+        return strings[code] + suffix
 
     def compress_file(self, input_stream: FileIO, output: 'Compressor.BitFile', argc: int, argv: list[str]):
         next_code: int = Compressor.FIRST_CODE
         string_code: int = -1
         index: int = 0
+        codes = array("H")
+
+        keyed = False
+        while argc > 0:
+            if argv[0] == "-k":
+                keyed = True
+            else:
+                print(f"Unknown argument: {argv[0]}")
+            argc -= 1
+            argv = argv[1:]
+        if keyed:
+            self.compress_keyed(input_stream, output)
+            return
 
-        # Initialize dictionary
-        for i in range(Compressor.TABLE_SIZE):
-            Compressor.dict_entries[i].code_value = Compressor.UNUSED
+        self.initialize_dictionary()
+        code_value = self.code_value
+        parent_code = self.parent_code
+        character_column = self.character
+        find_child_node = self.find_child_node
 
         # Read the first character
         first_byte = input_stream.read(1)
         if not first_byte:  # EOF
             string_code = Compressor.END_OF_STREAM
         else:
-            string_code = ord(first_byte)
+            string_code = first_byte[0]
+            output.report(bytes_in=1)
 
         while True:
-            char_byte = input_stream.read(1)
-            if not char_byte:  # EOF
+            chunk = input_stream.read(Compressor.CHUNK_SIZE)
+            if not chunk:  # EOF
                 break
-            character: int = ord(char_byte)
+            output.report(bytes_in=len(chunk))
+            for character in chunk:
+                index = find_child_node(string_code, character)
+
+                if code_value[index] != Compressor.UNUSED:
+                    string_code = code_value[index]
+                else:
+                    if next_code <= Compressor.MAX_CODE:
+                        code_value[index] = next_code
+                        parent_code[index] = string_code
+                        character_column[index] = character
+                        next_code += 1
+
+                    codes.append(string_code)
+                    if len(codes) == CompressorBitio.CODE_BATCH:
+                        output.write_codes(codes, Compressor.BITS)
+                        del codes[:]
+                    string_code = character
 
-            index = Compressor.find_child_node(string_code, character)
-
-            if Compressor.dict_entries[index].code_value != Compressor.UNUSED:
-                string_code = Compressor.dict_entries[index].code_value
-            else:
-                if next_code <= Compressor.MAX_CODE:
-                    Compressor.dict_entries[index].code_value = next_code
-                    Compressor.dict_entries[index].parent_code = string_code
-                    Compressor.dict_entries[index].character = chr(character)
-                    next_code += 1
+        # Write the last string and end-of-stream marker
+        codes.append(string_code)
+        codes.append(Compressor.END_OF_STREAM)
+        output.write_codes(codes, Compressor.BITS)
 
-                output.output_bits(string_code, Compressor.BITS)
-                string_code = character
+    def compress_keyed(self, input_stream: FileIO, output: 'Compressor.BitFile'):
+        """The same code stream, with strings keyed (parent_code << 8) | character in a dict."""
+        next_code: int = Compressor.FIRST_CODE
+        codes = array("H")
+        strings = {}
 
-        # Write the last string and end-of-stream marker
-        output.output_bits(string_code, Compressor.BITS)
-        output.output_bits(Compressor.END_OF_STREAM, Compressor.BITS)
+        first_byte = input_stream.read(1)
+        if not first_byte:  # EOF
+            string_code = Compressor.END_OF_STREAM
+        else:
+            string_code = first_byte[0]
+            output.report(bytes_in=1)
 
-        while argc > 0:
-            argc -= 1
-            print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
+        while True:
+            chunk = input_stream.read(Compressor.CHUNK_SIZE)
+            if not chunk:  # EOF
+                break
+            output.report(bytes_in=len(chunk))
+            for character in chunk:
+                key = (string_code << 8) | character
+                code = strings.get(key)
+                if code is not None:
+                    string_code = code
+                else:
+                    if next_code <= Compressor.MAX_CODE:
+                        strings[key] = next_code
+                        next_code += 1
+
+                    codes.append(string_code)
+                    if len(codes) == CompressorBitio.CODE_BATCH:
+                        output.write_codes(codes, Compressor.BITS)
+                        del codes[:]
+                    string_code = character
+
+        codes.append(string_code)
+        codes.append(Compressor.END_OF_STREAM)
+        output.write_codes(codes, Compressor.BITS)
 
     def expand_file(self, input_bit_file: 'Compressor.BitFile', output_stream: FileIO, argc: int, argv: list[str]):
         next_code: int = Compressor.FIRST_CODE
         new_code: int = 0
         old_code: int = 0
-        character: int = 0
-        count: int = 0
-
-        # Read the first code
-        try:
-            old_code = input_bit_file.input_bits(Compressor.BITS)
-        except EOFError:
-            return
+        bytes_out: int = 0
 
-        if old_code == Compressor.END_OF_STREAM:
+        self.initialize_dictionary()
+        # Codes arrive in batches; position is the next unused one
+        codes = input_bit_file.read_codes(CompressorBitio.CODE_BATCH, Compressor.BITS)
+        if not codes or codes[0] == Compressor.END_OF_STREAM:
             return
+        old_code = codes[0]
+        position = 1
 
-        character = old_code
-        output_stream.write(bytes([old_code]))
+        # strings[code] is the code's whole expansion, or None once the cache is full
+        strings = [bytes((c,)) for c in range(256)] + [None] * (Compressor.MAX_CODE + 1 - 256)
+        cached_bytes = 0
+        old_string = strings[old_code]
+        output = bytearray(old_string)
+        bytes_out += 1
 
         # Process input
         while True:
-            try:
-                new_code = input_bit_file.input_bits(Compressor.BITS)
-            except EOFError:
-                break
+            if position == len(codes):
+                codes = input_bit_file.read_codes(CompressorBitio.CODE_BATCH, Compressor.BITS)
+                position = 0
+                if not codes:
+                    break
+            new_code = codes[position]
+            position += 1
 
             if new_code == Compressor.END_OF_STREAM:
                 break
 
             if new_code >= next_code:
-                Compressor.decode_stack[0] = chr(character)
-                count = Compressor.decode_string(1, old_code)
+                string = old_string + old_string[:1]
             else:
-                count = Compressor.decode_string(0, new_code)
-
-            character = ord(Compressor.decode_stack[count - 1])
-
-            # Write decoded string to output
-            while count > 0:
-                count -= 1
-                output_stream.write(bytes([ord(Compressor.decode_stack[count])]))
+                string = strings[new_code]
+                if string is None:
+                    string = self.decode_string(new_code, strings)
+            output += string
+
+            bytes_out += len(string)
+            if bytes_out > CompressorBitio.PACIFIER_COUNT:
+                input_bit_file.report(bytes_out=bytes_out)
+                bytes_out = 0
+            if len(output) >= Compressor.CHUNK_SIZE:
+                output_stream.write(output)
+                output.clear()
 
             if next_code <= Compressor.MAX_CODE:
-                Compressor.dict_entries[next_code].parent_code = old_code
-                Compressor.dict_entries[next_code].character = chr(character)
+                self.parent_code[next_code] = old_code
+                self.character[next_code] = string[0]
+                if cached_bytes + len(old_string) < Compressor.CACHE_BYTES:
+                    strings[next_code] = old_string + string[:1]
+                    cached_bytes += len(old_string) + 1
                 next_code += 1
 
             old_code = new_code
+            old_string = string
+
+        output_stream.write(output)
+        input_bit_file.report(bytes_out=bytes_out)
 
         while argc > 0:
             argc -= 1
             print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
+
+
+def compress_bytes(data, argv: Sequence[str] = ()) -> bytearray:
+    """Compress an in-memory buffer without touching the filesystem."""
+    output = CompressorBitio.BitFile.open_output_bit_buffer()
+    Compressor().compress_file(BytesIO(data), output, len(argv), argv)
+    output.close_bit_file()
+    return output.getvalue()
+
+
+def expand_bytes(data, argv: Sequence[str] = ()) -> bytes:
+    input_bit_file = CompressorBitio.BitFile.open_input_bit_buffer(data)
+    output_stream = BytesIO()
+    Compressor().expand_file(input_bit_file, output_stream, len(argv), argv)
+    input_bit_file.close_bit_file()
+    return output_stream.getvalue()
@@ -1,18 +1,19 @@
 # Bradford Arrington 2025
 import sys
-from io import FileIO, SEEK_SET, SEEK_CUR
+from io import BytesIO, FileIO, SEEK_SET, SEEK_CUR
 from collections import defaultdict
+from array import array
 from bitio import CompressorBitio # as CompressorBitio
 import time
 import tracemalloc
 import psutil
 import os
 import struct
-from typing import BinaryIO, List, Tuple, Optional
+from typing import BinaryIO, List, Tuple, Optional, Sequence
     
 class Compressor_lzw15v:
     COMPRESSION_NAME = "LZW 15 Bit Variable Rate Encoder"
-    USAGE = "in-file out-file\n\n"
+    USAGE = "in-file out-file [-k]\n\n -k finds strings with a Python dict instead of the book's hash table\n"
     BITS  =                     15
     MAX_CODE =                  ( ( 1 << BITS ) - 1 )
     TABLE_SIZE =                35023
@@ -22,10 +23,15 @@ class Compressor_lzw15v:
     FLUSH_CODE =                258
     FIRST_CODE =                259
     UNUSED  =                   -1
+    CHUNK_SIZE =                64 * 1024
+    # expand_file keeps each code's whole string while the total stays under
+    # this many bytes; later codes are rebuilt from their parents as needed
+    CACHE_BYTES =               1 << 22
 
     def __init__(self):
         self.dict = [None] * self.TABLE_BANKS
-        self.decode_stack = [0] * self.TABLE_SIZE
+        self.parent_code = array("H", [0]) * self.TABLE_SIZE
+        self.character = bytearray(self.TABLE_SIZE)
         self.next_code = self.FIRST_CODE
         self.current_code_bits = 9
         self.next_bump_code = 511
@@ -42,7 +48,6 @@ class Compressor_lzw15v:
         for i in range(self.TABLE_SIZE):
             self.dict_lookup(i)['code_value'] = self.UNUSED
         self.next_code = self.FIRST_CODE
-        print('F', end='', flush=True)
         self.current_code_bits = 9
         self.next_bump_code = 511
 
@@ -54,18 +59,14 @@ class Compressor_lzw15v:
             raise RuntimeError(f"Dictionary bank {bank} not initialized (index={index})")
         return self.dict[bank][offset]
 
-    def decode_string(self, count: int, code: int) -> int:
-        """
-        Decode a string from the dictionary and store it in decode_stack
-        Returns the count of characters placed in the stack
-        """
-        while code > 255:
-            dict_entry = self.dict_lookup(code)
-            self.decode_stack[count] = dict_entry['character']
-            count += 1
-            code = dict_entry['parent_code']
-        self.decode_stack[count] = code
-        return count + 1
+    def decode_string(self, code: int, strings: list) -> bytes:
+        """Expand a code the cache has no room for: walk parents up to a cached string."""
+        suffix = bytearray()
+        while strings[code] is None:
+            suffix.append(self.character[code])
+            code = self.parent_code[code]
+        suffix.reverse()
+        return strings[code] + suffix
 
     def find_child_node(self, parent_code: int, child_character: int) -> int:
         """
@@ -95,6 +96,18 @@ class Compressor_lzw15v:
         string_code: int = 0
         index: int = 0
 
+        keyed = False
+        while argc > 0:
+            if argv[0] == "-k":
+                keyed = True
+            else:
+                print(f"Unknown argument: {argv[0]}")
+            argc -= 1
+            argv = argv[1:]
+        if keyed:
+            self.compress_keyed(input_stream, output)
+            return
+
         # Initialize dictionary
         #self.initialize_storage() # handled in __init__
         self.initialize_dictionary()
@@ -104,95 +117,171 @@ class Compressor_lzw15v:
             string_code = self.END_OF_STREAM
         else:
             string_code = char_byte[0]
+            output.report(bytes_in=1)
 
         while True:
-            char_byte = input_stream.read(1)
-            if not char_byte:  # EOF
+            chunk = input_stream.read(self.CHUNK_SIZE)
+            if not chunk:  # EOF
                 break
 
-            character = char_byte[0]
+            output.report(bytes_in=len(chunk))
+            for character in chunk:
+                index = self.find_child_node( string_code, character)
+                dict_entry = self.dict_lookup(index)
 
-            index = self.find_child_node( string_code, character)
-            dict_entry = self.dict_lookup(index)
-            
-            if dict_entry['code_value'] != self.UNUSED:
-                string_code = dict_entry['code_value']
-            else:
-                dict_entry['code_value'] = self.next_code
-                dict_entry['parent_code'] = string_code
-                dict_entry['character'] = character
+                if dict_entry['code_value'] != self.UNUSED:
+                    string_code = dict_entry['code_value']
+                else:
+                    dict_entry['code_value'] = self.next_code
+                    dict_entry['parent_code'] = string_code
+                    dict_entry['character'] = character
 
-                output.output_bits( string_code, self.current_code_bits )
-                string_code = character
-                self.next_code += 1
+                    output.output_bits( string_code, self.current_code_bits )
+                    string_code = character
+                    self.next_code += 1
 
-                if self.next_code > self.MAX_CODE:
-                    output.output_bits( self.FLUSH_CODE, self.current_code_bits )
-                    self.initialize_dictionary()
-                elif self.next_code > self.next_bump_code:
-                    output.output_bits( self.BUMP_CODE, self.current_code_bits )
-                    self.current_code_bits += 1
-                    self.next_bump_code <<= 1
-                    self.next_bump_code |= 1
-                    print( 'B' )
+                    if self.next_code > self.MAX_CODE:
+                        output.output_bits( self.FLUSH_CODE, self.current_code_bits )
+                        self.initialize_dictionary()
+                    elif self.next_code > self.next_bump_code:
+                        output.output_bits( self.BUMP_CODE, self.current_code_bits )
+                        self.current_code_bits += 1
+                        self.next_bump_code <<= 1
+                        self.next_bump_code |= 1
 
         # Write the last string and end-of-stream marker
         output.output_bits(string_code, self.current_code_bits)
         output.output_bits(self.END_OF_STREAM, self.current_code_bits)
-        # flush ??
 
-        while argc > 0:
-            argc -= 1
-            print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
+    def compress_keyed(self, input_stream: FileIO, output: 'CompressorBitio.BitFile'):
+        """The same code stream, with strings keyed (parent_code << 8) | character in a dict."""
+        strings = {}
+        next_code = self.FIRST_CODE
+        current_code_bits = 9
+        next_bump_code = 511
+
+        char_byte = input_stream.read(1)
+        if not char_byte:  # EOF
+            string_code = self.END_OF_STREAM
+        else:
+            string_code = char_byte[0]
+            output.report(bytes_in=1)
+
+        while True:
+            chunk = input_stream.read(self.CHUNK_SIZE)
+            if not chunk:  # EOF
+                break
+
+            output.report(bytes_in=len(chunk))
+            for character in chunk:
+                key = (string_code << 8) | character
+                code = strings.get(key)
+                if code is not None:
+                    string_code = code
+                    continue
+
+                strings[key] = next_code
+                output.output_bits( string_code, current_code_bits )
+                string_code = character
+                next_code += 1
+
+                if next_code > self.MAX_CODE:
+                    output.output_bits( self.FLUSH_CODE, current_code_bits )
+                    strings.clear()
+                    next_code = self.FIRST_CODE
+                    current_code_bits = 9
+                    next_bump_code = 511
+                elif next_code > next_bump_code:
+                    output.output_bits( self.BUMP_CODE, current_code_bits )
+                    current_code_bits += 1
+                    next_bump_code <<= 1
+                    next_bump_code |= 1
+
+        # Write the last string and end-of-stream marker
+        output.output_bits(string_code, current_code_bits)
+        output.output_bits(self.END_OF_STREAM, current_code_bits)
    
     def expand_file(self, input_bit_file: 'CompressorBitio.BitFile', output_stream: FileIO, argc: int, argv: list[str]):
         """Expand compressed file using LZW algorithm"""
         new_code: int = 0
         old_code: int = 0
-        character: int = 0
-        count: int = 0
-        
-        #self.initialize_storage()
+        bytes_out: int = 0
+        singles = [bytes((c,)) for c in range(256)]
+        output = bytearray()
+
         while True:
-            self.initialize_dictionary()
+            # Only the code counters need resetting; the decoder keeps its
+            # strings below rather than in the encoder's table
+            self.next_code = self.FIRST_CODE
+            self.current_code_bits = 9
             old_code = input_bit_file.input_bits(self.current_code_bits)
             if old_code == self.END_OF_STREAM:
-	            break
-                
-            character = old_code
-            output_stream.write(bytes([character]))
-            
+                break
+
+            # strings[code] is the code's whole expansion, or None once the cache is full
+            strings = singles + [None] * (self.TABLE_SIZE - 256)
+            cached_bytes = 0
+            old_string = strings[old_code]
+            output += old_string
+            bytes_out += 1
+
             while True:
                 new_code = input_bit_file.input_bits(self.current_code_bits)
                 if new_code == self.END_OF_STREAM:
+                    output_stream.write(output)
+                    input_bit_file.report(bytes_out=bytes_out)
                     return
                 if new_code == self.FLUSH_CODE:
                     break
                 if new_code == self.BUMP_CODE:
                     self.current_code_bits += 1
-                    print('B', end='', flush=True)
                     continue
-                
+
                 if new_code >= self.next_code:
-                    self.decode_stack[0] = character
-                    count = self.decode_string(1, old_code)
+                    string = old_string + old_string[:1]
                 else:
-                    count = self.decode_string(0, new_code)
-                
-                character = self.decode_stack[count - 1]
-                
-                # Output the decoded string
-                for i in range(count - 1, -1, -1):
-                    output_stream.write(bytes([self.decode_stack[i]]))
-                
+                    string = strings[new_code]
+                    if string is None:
+                        string = self.decode_string(new_code, strings)
+                output += string
+
+                bytes_out += len(string)
+                if bytes_out > CompressorBitio.PACIFIER_COUNT:
+                    input_bit_file.report(bytes_out=bytes_out)
+                    bytes_out = 0
+                if len(output) >= self.CHUNK_SIZE:
+                    output_stream.write(output)
+                    output.clear()
+
                 # Add new entry to dictionary
                 if self.next_code < self.TABLE_SIZE:
-                    dict_entry = self.dict_lookup(self.next_code)
-                    dict_entry['parent_code'] = old_code
-                    dict_entry['character'] = character
+                    self.parent_code[self.next_code] = old_code
+                    self.character[self.next_code] = string[0]
+                    if cached_bytes + len(old_string) < self.CACHE_BYTES:
+                        strings[self.next_code] = old_string + string[:1]
+                        cached_bytes += len(old_string) + 1
                     self.next_code += 1
-                
+
                 old_code = new_code
+                old_string = string
+        output_stream.write(output)
+        input_bit_file.report(bytes_out=bytes_out)
         while argc > 0:
             argc -= 1
             print(f"Unknown argument: {argv[len(argv) - argc - 1]}")
+
+
+def compress_bytes(data, argv: Sequence[str] = ()) -> bytearray:
+    """Compress an in-memory buffer without touching the filesystem."""
+    output = CompressorBitio.BitFile.open_output_bit_buffer()
+    Compressor_lzw15v().compress_file(BytesIO(data), output, len(argv), argv)
+    output.close_bit_file()
+    return output.getvalue()
+
+
+def expand_bytes(data, argv: Sequence[str] = ()) -> bytes:
+    input_bit_file = CompressorBitio.BitFile.open_input_bit_buffer(data)
+    output_stream = BytesIO()
+    Compressor_lzw15v().expand_file(input_bit_file, output_stream, len(argv), argv)
+    input_bit_file.close_bit_file()
+    return output_stream.getvalue()
@@ -81,7 +81,8 @@ if __name__ == '__main__':
 
     remaining_args = arguments[3:]
     try:
-          output = track_performance("OpenBitFile", bitio.BitFile.open_output_bit_file,arguments[2])
+          pacifier = bitio.ProgressReporter(bitio.print_pacifier, bitio.PACIFIER_COUNT + 1)
+          output = track_performance("OpenBitFile", bitio.BitFile.open_output_bit_file, arguments[2], 0, pacifier)
           with open(arguments[1], 'rb') as input_file:
             track_performance("CompressFile", compress_file, input_file, output, len(remaining_args), remaining_args)
           track_performance("CloseBitFile", output.close_bit_file)
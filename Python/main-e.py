@@ -62,7 +62,8 @@ if __name__ == '__main__':
 
     remaining_args = arguments[3:]
     try:
-        input_file = bitio.BitFile.open_input_bit_file(arguments[1])
+        pacifier = bitio.ProgressReporter(bitio.print_pacifier, bitio.PACIFIER_COUNT + 1)
+        input_file = bitio.BitFile.open_input_bit_file(arguments[1], 0, pacifier)
         output_file = open(arguments[2], 'wb')
             
         print(f"\nDecompressing {arguments[1]} to {arguments[2]}")